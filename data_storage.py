@@ -4,6 +4,7 @@ import time
 import threading
 import logging
 import zlib
+from contextlib import contextmanager, nullcontext
 from typing import Dict, List, Optional, Union, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -29,21 +30,56 @@ class TimeSeriesDB:
         
         # Initialize buffers
         self.data_buffer: List[Dict] = []
-        self.buffer_lock = threading.Lock()
+        self.buffer_lock = threading.RLock()  # insert() flushes while holding it
+        
+        # One connection per thread, all closed together in close().
+        # An in-memory database only exists on its own connection, so there
+        # all threads share that one connection and take turns on it.
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.in_memory = db_path == ":memory:"
+        self._memory_conn: Optional[sqlite3.Connection] = None
+        self._serial_lock = threading.Lock() if self.in_memory else nullcontext()
         
         # Initialize database
         self._init_database()
         
         # Start background tasks
         self.running = True
+        self._stop_event = threading.Event()
         self.flush_thread = threading.Thread(target=self._periodic_flush)
         self.cleanup_thread = threading.Thread(target=self._periodic_cleanup)
         self.flush_thread.start()
         self.cleanup_thread.start()
 
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = self._memory_conn if self.in_memory else getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # WAL lets readers run alongside the writer; NORMAL skips per-commit fsync
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if self.in_memory:
+                self._memory_conn = conn
+            else:
+                self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Run a transaction on this thread's connection"""
+        with self._serial_lock:
+            conn = self._get_connection()
+            with conn:
+                yield conn
+
     def _init_database(self):
         """Initialize database tables"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             cursor = conn.cursor()
             
             # Time-series data table
@@ -97,6 +133,33 @@ class TimeSeriesDB:
         except Exception as e:
             self.logger.error(f"Failed to insert record: {e}")
 
+    def insert_many(self, records: List[Tuple[str, Optional[float], Optional[Dict], Optional[Dict]]]):
+        """Insert (metric_name, value, tags, data) records in a single transaction"""
+        try:
+            timestamp = time.time()
+            rows = [
+                (
+                    timestamp,
+                    metric_name,
+                    value,
+                    json.dumps(tags) if tags else None,
+                    self._prepare_data(data) if data else None,
+                    0
+                )
+                for metric_name, value, tags, data in records
+            ]
+            
+            with self._connection() as conn:
+                conn.executemany("""
+                    INSERT INTO timeseries 
+                    (timestamp, metric_name, value, tags, data, is_compressed)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, rows)
+                conn.commit()
+                
+        except Exception as e:
+            self.logger.error(f"Failed to insert records: {e}")
+
     def query(self, metric_name: str, start_time: float, end_time: float,
               tags: Optional[Dict] = None, limit: Optional[int] = None) -> pd.DataFrame:
         """Query time-series data"""
@@ -120,7 +183,7 @@ class TimeSeriesDB:
             if limit:
                 query += f" LIMIT {limit}"
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 # Read data into DataFrame
                 df = pd.read_sql_query(query, conn, params=params)
                 
@@ -138,7 +201,7 @@ class TimeSeriesDB:
     def set_retention_policy(self, metric_name: str, retention_days: int, compression_enabled: bool = True):
         """Set retention policy for a metric"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     INSERT OR REPLACE INTO retention_policies (metric_name, retention_days, compression_enabled)
@@ -178,7 +241,7 @@ class TimeSeriesDB:
     def get_metrics_summary(self) -> Dict:
         """Get summary of stored metrics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
                 # Get metrics count and size
@@ -247,7 +310,7 @@ class TimeSeriesDB:
                 return
             
             try:
-                with sqlite3.connect(self.db_path) as conn:
+                with self._connection() as conn:
                     cursor = conn.cursor()
                     cursor.executemany("""
                         INSERT INTO timeseries 
@@ -276,17 +339,17 @@ class TimeSeriesDB:
         while self.running:
             try:
                 self._flush_buffer()
-                time.sleep(60)  # Flush every minute
+                self._stop_event.wait(60)  # Flush every minute
                 
             except Exception as e:
                 self.logger.error(f"Periodic flush failed: {e}")
-                time.sleep(5)
+                self._stop_event.wait(5)
 
     def _periodic_cleanup(self):
         """Periodically clean up old data"""
         while self.running:
             try:
-                with sqlite3.connect(self.db_path) as conn:
+                with self._connection() as conn:
                     cursor = conn.cursor()
                     
                     # Get retention policies
@@ -310,21 +373,27 @@ class TimeSeriesDB:
                     conn.commit()
                     
                 # Sleep for 6 hours before next cleanup
-                time.sleep(21600)
+                self._stop_event.wait(21600)
                 
             except Exception as e:
                 self.logger.error(f"Periodic cleanup failed: {e}")
-                time.sleep(300)
+                self._stop_event.wait(300)
 
     def close(self):
         """Close database connection and stop background tasks"""
         self.running = False
+        self._stop_event.set()
         self._flush_buffer()
         
         if self.flush_thread:
             self.flush_thread.join()
         if self.cleanup_thread:
             self.cleanup_thread.join()
+        
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
 
 # Example usage
 if __name__ == '__main__':
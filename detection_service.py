@@ -3,14 +3,16 @@ import queue
 import time
 import logging
 import numpy as np
-from typing import Optional, List, Dict, Tuple
-import cv2
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from typing import Callable, Optional, List, Dict, Tuple
 import tensorrt as trt
 import pycuda.driver as cuda
 import pycuda.autoinit
 from config import ConfigManager
 from logging_config import LoggerSetup, PerformanceProfiler
 from metrics import MetricsCollector
+import preprocessing
 
 class DetectionService:
     def __init__(self):
@@ -43,10 +45,17 @@ class DetectionService:
         self.host_outputs = None
         self.device_inputs = None
         self.device_outputs = None
+        self._io_specs: List[Tuple[str, Tuple[int, ...], type, bool]] = []
         
         # Initialize TensorRT engine
         self._initialize_tensorrt()
         
+        # Preprocessing workers and their shared-memory slots
+        self.preprocess_pool: Optional[ProcessPoolExecutor] = None
+        self._frames_shm: Optional[shared_memory.SharedMemory] = None
+        self._tensors_shm: Optional[shared_memory.SharedMemory] = None
+        self._setup_preprocessing()
+        
         # Register configuration observer
         self.config.register_observer(self._handle_config_change)
 
@@ -81,20 +90,78 @@ class DetectionService:
         self.device_inputs = []
         self.device_outputs = []
         
-        for binding in self.engine:
-            size = trt.volume(self.engine.get_binding_shape(binding))
-            dtype = trt.nptype(self.engine.get_binding_dtype(binding))
-            
+        # Introspect the engine once; everything below works from plain tuples
+        self._io_specs = []
+        for i in range(self.engine.num_io_tensors):
+            name = self.engine.get_tensor_name(i)
+            self._io_specs.append((
+                name,
+                tuple(self.engine.get_tensor_shape(name)),
+                trt.nptype(self.engine.get_tensor_dtype(name)),
+                self.engine.get_tensor_mode(name) == trt.TensorIOMode.INPUT
+            ))
+        
+        for name, shape, dtype, is_input in self._io_specs:
             # Allocate host and device memory
-            host_mem = cuda.pagelocked_empty(size, dtype)
+            host_mem = cuda.pagelocked_empty(trt.volume(shape), dtype)
             device_mem = cuda.mem_alloc(host_mem.nbytes)
             
-            if self.engine.binding_is_input(binding):
+            if is_input:
                 self.host_inputs.append(host_mem)
                 self.device_inputs.append(device_mem)
             else:
                 self.host_outputs.append(host_mem)
                 self.device_outputs.append(device_mem)
+            
+            # Tensor address is bound once for every enqueueV3 call
+            self.context.set_tensor_address(name, int(device_mem))
+
+    def _setup_preprocessing(self):
+        """Create shared-memory slots and the preprocessing worker pool"""
+        self._frame_shape = (
+            self.config.get('hardware.camera.height', 720),
+            self.config.get('hardware.camera.width', 1280),
+            3
+        )
+        frame_bytes = int(np.prod(self._frame_shape))
+        tensor_bytes = int(np.prod(preprocessing.tensor_shape())) * np.dtype(np.float32).itemsize
+        
+        self._frames_shm = shared_memory.SharedMemory(
+            create=True, size=preprocessing.NUM_SLOTS * frame_bytes
+        )
+        self._tensors_shm = shared_memory.SharedMemory(
+            create=True, size=preprocessing.NUM_SLOTS * tensor_bytes
+        )
+        self._shm_frames, self._shm_tensors = preprocessing.frame_views(
+            self._frames_shm.buf, self._tensors_shm.buf, self._frame_shape
+        )
+        
+        # Scratch buffers for frames preprocessed in-process
+        self._resize_buf = np.empty(preprocessing.resized_shape(), dtype=np.uint8)
+        self._chw_buf = np.empty(preprocessing.tensor_shape(), dtype=np.float32)
+        self._next_slot = 0
+        
+        # Spawn rather than fork so workers never inherit the CUDA context
+        self.preprocess_pool = ProcessPoolExecutor(
+            max_workers=self.config.get('detection.preprocess_workers', 2),
+            mp_context=get_context('spawn'),
+            initializer=preprocessing.attach_shared_buffers,
+            initargs=(self._frames_shm.name, self._tensors_shm.name, self._frame_shape)
+        )
+
+    def _release_preprocessing(self):
+        """Stop preprocessing workers and free shared memory"""
+        if self.preprocess_pool:
+            self.preprocess_pool.shutdown()
+            self.preprocess_pool = None
+        
+        # Drop our views before closing the mappings they point into
+        self._shm_frames = self._shm_tensors = None
+        for shm in (self._frames_shm, self._tensors_shm):
+            if shm:
+                shm.close()
+                shm.unlink()
+        self._frames_shm = self._tensors_shm = None
 
     def start(self):
         """Start the detection service"""
@@ -128,20 +195,19 @@ class DetectionService:
         except queue.Empty:
             return None
 
-    @PerformanceProfiler.profile(logging.getLogger(__name__))
     def _process_frame(self, frame: np.ndarray) -> Dict:
         """Process a single frame through the detection model"""
-        # Preprocess
-        input_data = self._preprocess(frame)
-        
+        # Nothing to overlap with a single frame, so preprocess in-process
+        return self._infer(self._preprocess(frame))
+
+    @PerformanceProfiler.profile(logging.getLogger(__name__))
+    def _infer(self, input_data: np.ndarray) -> Dict:
+        """Run a preprocessed input tensor through the detection model"""
         # Copy input data to device
         cuda.memcpy_htod_async(self.device_inputs[0], input_data, self.stream)
         
         # Execute inference
-        self.context.execute_async_v2(
-            bindings=[int(inp) for inp in self.device_inputs + self.device_outputs],
-            stream_handle=self.stream.handle
-        )
+        self.context.execute_async_v3(stream_handle=self.stream.handle)
         
         # Copy results back to host
         cuda.memcpy_dtoh_async(self.host_outputs[0], self.device_outputs[0], self.stream)
@@ -154,12 +220,27 @@ class DetectionService:
 
     def _preprocess(self, frame: np.ndarray) -> np.ndarray:
         """Preprocess frame for inference"""
-        # Implement preprocessing based on model requirements
-        # This is a placeholder - adjust according to your model
-        processed = cv2.resize(frame, (300, 300))
-        processed = processed.transpose((2, 0, 1))  # HWC to CHW
-        processed = processed.astype(np.float32) / 255.0
-        return processed
+        return preprocessing.preprocess_into(frame, self._resize_buf, self._chw_buf)
+
+    def _start_preprocess(self, frame: np.ndarray) -> Callable[[], np.ndarray]:
+        """Start preprocessing a frame; the returned callable waits for its tensor"""
+        if frame.shape != self._frame_shape:
+            # Unexpected resolution, e.g. a test frame: preprocess in-process,
+            # deferred so the shared scratch buffers are free by then
+            return lambda: self._preprocess(frame)
+        
+        # Hand the frame to a worker process through shared memory so the
+        # numpy work runs outside this process's GIL. Slots alternate, so the
+        # worker fills one while the other is being copied to the device.
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % preprocessing.NUM_SLOTS
+        np.copyto(self._shm_frames[slot], frame)
+        future = self.preprocess_pool.submit(preprocessing.preprocess_slot, slot)
+        
+        def wait() -> np.ndarray:
+            future.result()
+            return self._shm_tensors[slot]
+        return wait
 
     def _postprocess(self, raw_output: np.ndarray) -> Dict:
         """Postprocess detection outputs"""
@@ -168,14 +249,20 @@ class DetectionService:
         confidence_threshold = self.config.get('detection.confidence_threshold', 0.5)
         
         # Example output format
+        scores = np.empty(0, dtype=np.float32)
         return {
             'detections': [],  # List of detection boxes
-            'confidence_scores': [],  # Confidence scores
-            'classes': []  # Class labels
+            'confidence_scores': scores,  # Confidence scores
+            'classes': [],  # Class labels
+            'confidence_sum': float(scores.sum()),
+            'confidence_count': scores.size
         }
 
     def _detection_loop(self):
         """Main detection loop"""
+        # Tensor of the frame awaiting inference; the frame after it is
+        # preprocessed in the other slot while this one is inferred
+        pending: Optional[Callable[[], np.ndarray]] = None
         while self.running:
             try:
                 # Rate limiting
@@ -187,18 +274,25 @@ class DetectionService:
                     time.sleep(0.001)  # Small sleep to prevent CPU spinning
                     continue
                 
-                # Get frame from queue
-                frame = self.input_queue.get(timeout=0.1)
+                # Get frame from queue unless one is already in flight
+                if pending is None:
+                    pending = self._start_preprocess(self.input_queue.get(timeout=0.1))
                 
-                # Process frame
+                # Process frame, preprocessing the next one alongside it
                 start_time = time.time()
-                result = self._process_frame(frame)
+                try:
+                    following = self._start_preprocess(self.input_queue.get_nowait())
+                except queue.Empty:
+                    following = None
+                current, pending = pending, following
+                result = self._infer(current())
                 processing_time = time.time() - start_time
                 
                 # Update metrics
-                self.metrics.record_detection(
+                self.metrics.record_detection_scores(
                     latency=processing_time,
-                    confidence=np.mean(result['confidence_scores']) if result['confidence_scores'] else 0
+                    confidence_sum=result['confidence_sum'],
+                    confidence_count=result['confidence_count']
                 )
                 
                 # Enqueue result
@@ -211,6 +305,7 @@ class DetectionService:
             except queue.Empty:
                 continue
             except Exception as e:
+                pending = None
                 self.logger.error(f"Error in detection loop: {e}")
                 time.sleep(1)  # Prevent rapid error loops
 
@@ -222,6 +317,8 @@ class DetectionService:
     def __del__(self):
         """Cleanup resources"""
         self.stop()
+        if hasattr(self, 'preprocess_pool'):
+            self._release_preprocessing()
         if hasattr(self, 'context'):
             self.context.destroy()
         if hasattr(self, 'engine'):
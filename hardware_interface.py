@@ -1,5 +1,8 @@
 import threading
 import time
+import queue
+import struct
+import selectors
 import serial
 import logging
 from typing import Optional, Dict, Tuple
@@ -12,6 +15,23 @@ import RPi.GPIO as GPIO
 from config import ConfigManager
 from logging_config import LoggerSetup, PerformanceProfiler
 
+# BNO055 data registers from ACC_DATA_X_LSB (0x08) through GRV_DATA_Z_MSB
+# (0x33): accel, mag, gyro, euler, quaternion, linear accel, gravity as
+# contiguous little-endian int16 values
+BNO055_DATA_START = 0x08
+BNO055_DATA_BLOCK = struct.Struct('<22h')
+
+# (field, first int16 index, count, scale) matching adafruit_bno055 units
+BNO055_FIELDS = (
+    ('acceleration', 0, 3, 1 / 100),
+    ('magnetic', 3, 3, 1 / 16),
+    ('gyro', 6, 3, 0.001090830782496456),
+    ('euler', 9, 3, 1 / 16),
+    ('quaternion', 12, 4, 1 / (1 << 14)),
+    ('linear_acceleration', 16, 3, 1 / 100),
+    ('gravity', 19, 3, 1 / 100)
+)
+
 class HardwareInterface:
     def __init__(self):
         # Initialize configuration
@@ -31,6 +51,10 @@ class HardwareInterface:
         # Threading control
         self.running = False
         self.sensor_thread: Optional[threading.Thread] = None
+        self.lora_thread: Optional[threading.Thread] = None
+        
+        # Lines received by the LoRa reader thread
+        self.lora_messages: queue.Queue = queue.Queue()
         
         # Register configuration observer
         self.config.register_observer(self._handle_config_change)
@@ -106,6 +130,11 @@ class HardwareInterface:
         try:
             i2c = busio.I2C(board.SCL, board.SDA)
             self.imu = adafruit_bno055.BNO055_I2C(i2c)
+            
+            # Buffers for reading the whole data block in one transaction
+            self._imu_register = bytes([BNO055_DATA_START])
+            self._imu_buffer = bytearray(BNO055_DATA_BLOCK.size)
+            
             self.logger.info("IMU initialized successfully")
             
         except Exception as e:
@@ -133,7 +162,9 @@ class HardwareInterface:
         if not self.running:
             self.running = True
             self.sensor_thread = threading.Thread(target=self._sensor_loop)
+            self.lora_thread = threading.Thread(target=self._lora_reader)
             self.sensor_thread.start()
+            self.lora_thread.start()
             GPIO.output(self.status_led, GPIO.HIGH)
             self.logger.info("Hardware interface started")
 
@@ -143,6 +174,8 @@ class HardwareInterface:
             self.running = False
             if self.sensor_thread:
                 self.sensor_thread.join()
+            if self.lora_thread:
+                self.lora_thread.join()
             GPIO.output(self.status_led, GPIO.LOW)
             self.logger.info("Hardware interface stopped")
 
@@ -172,24 +205,41 @@ class HardwareInterface:
     def read_lora_message(self) -> Optional[str]:
         """Read message from LoRa"""
         try:
-            if self.lora.in_waiting:
-                return self.lora.readline().decode().strip()
-            return None
-        except Exception as e:
-            self.logger.error(f"Failed to read LoRa message: {e}")
+            return self.lora_messages.get_nowait()
+        except queue.Empty:
             return None
 
+    def _lora_reader(self):
+        """Read LoRa lines as the serial port becomes readable"""
+        selector = selectors.DefaultSelector()
+        selector.register(self.lora.fileno(), selectors.EVENT_READ)
+        try:
+            while self.running:
+                try:
+                    # Sleep in the kernel until data arrives; the timeout
+                    # only bounds how long stop() waits for this thread
+                    if selector.select(timeout=0.1):
+                        line = self.lora.readline()
+                        if line:
+                            self.lora_messages.put(line.decode().strip())
+                
+                except Exception as e:
+                    self.logger.error(f"Failed to read LoRa message: {e}")
+                    time.sleep(1)
+        finally:
+            selector.close()
+
     def get_imu_data(self) -> Dict[str, float]:
         """Get IMU sensor data"""
         try:
+            # One I2C burst read instead of a transaction per property
+            with self.imu.i2c_device as i2c:
+                i2c.write_then_readinto(self._imu_register, self._imu_buffer)
+            raw = BNO055_DATA_BLOCK.unpack_from(self._imu_buffer)
+            
             return {
-                'acceleration': self.imu.acceleration,
-                'magnetic': self.imu.magnetic,
-                'gyro': self.imu.gyro,
-                'euler': self.imu.euler,
-                'quaternion': self.imu.quaternion,
-                'linear_acceleration': self.imu.linear_acceleration,
-                'gravity': self.imu.gravity
+                name: tuple(v * scale for v in raw[start:start + count])
+                for name, start, count, scale in BNO055_FIELDS
             }
         except Exception as e:
             self.logger.error(f"Failed to read IMU data: {e}")
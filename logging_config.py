@@ -1,19 +1,24 @@
 import logging
 import logging.handlers
-import json
 import os
+import queue
+import atexit
 import socket
 from datetime import datetime
 from functools import wraps
 import time
 from typing import Optional, Dict, Any, Callable
 import threading
+import orjson
+
+# Pre-bound to avoid an attribute lookup per formatted record
+_utcfromtimestamp = datetime.utcfromtimestamp
 
 class JSONFormatter(logging.Formatter):
     """Custom JSON formatter for structured logging"""
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            'timestamp': datetime.utcfromtimestamp(record.created).isoformat(),
+            'timestamp': _utcfromtimestamp(record.created),
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -28,9 +33,17 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, 'extra_fields'):
             log_data.update(record.extra_fields)
 
-        return json.dumps(log_data)
+        # orjson serializes datetime natively and returns bytes; the
+        # logging handlers expect str, so decode the UTF-8 result
+        return orjson.dumps(log_data).decode()
 
 class LoggerSetup:
+    # Active queue listener per logger name, so re-initializing a logger
+    # (every component creates its own LoggerSetup) replaces the previous
+    # listener thread instead of leaking it
+    _listeners: Dict[str, logging.handlers.QueueListener] = {}
+    _listeners_lock = threading.Lock()
+
     def __init__(
         self,
         log_dir: str = 'logs',
@@ -58,10 +71,13 @@ class LoggerSetup:
         self.logger.handlers = []
         
         # Add handlers
+        self._file_handler: Optional[logging.Handler] = None
+        self._syslog_handler: Optional[logging.Handler] = None
         self._setup_file_handler()
         self._setup_console_handler()
         if remote_syslog:
             self._setup_syslog_handler()
+        self._setup_queue_listener()
 
     def _setup_file_handler(self):
         """Setup rotating file handler with JSON formatting"""
@@ -72,7 +88,8 @@ class LoggerSetup:
             backupCount=self.backup_count
         )
         handler.setFormatter(JSONFormatter())
-        self.logger.addHandler(handler)
+        # Attached through the queue listener, not directly to the logger
+        self._file_handler = handler
 
     def _setup_console_handler(self):
         """Setup console handler for development"""
@@ -90,7 +107,33 @@ class LoggerSetup:
             facility=logging.handlers.SysLogHandler.LOG_LOCAL0
         )
         handler.setFormatter(JSONFormatter())
-        self.logger.addHandler(handler)
+        # Attached through the queue listener, not directly to the logger
+        self._syslog_handler = handler
+
+    def _setup_queue_listener(self):
+        """Route file/syslog output through a background listener thread"""
+        handlers = [h for h in (self._file_handler, self._syslog_handler) if h]
+        log_queue = queue.SimpleQueue()
+        self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        
+        listener = logging.handlers.QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        with self._listeners_lock:
+            previous = self._listeners.get(self.app_name)
+            self._listeners[self.app_name] = listener
+        if previous:
+            previous.stop()
+        listener.start()
+        self._listener = listener
+
+    def shutdown(self):
+        """Flush queued records and stop the listener thread"""
+        with self._listeners_lock:
+            if self._listeners.get(self.app_name) is not self._listener:
+                return  # Already replaced or stopped
+            del self._listeners[self.app_name]
+        self._listener.stop()
 
     def get_logger(self) -> logging.Logger:
         """Get the configured logger"""
@@ -101,6 +144,15 @@ class LoggerSetup:
         self.debug_mode = enabled
         self.logger.setLevel(logging.DEBUG if enabled else logging.INFO)
 
+@atexit.register
+def _stop_queue_listeners():
+    """Drain pending log records before interpreter shutdown"""
+    with LoggerSetup._listeners_lock:
+        listeners = list(LoggerSetup._listeners.values())
+        LoggerSetup._listeners.clear()
+    for listener in listeners:
+        listener.stop()
+
 class PerformanceProfiler:
     """Context manager and decorator for performance profiling"""
     def __init__(self, logger: logging.Logger, operation: str):
@@ -110,13 +162,13 @@ class PerformanceProfiler:
         self.thread_id = threading.get_ident()
 
     def __enter__(self):
-        self.start_time = time.time()
+        self.start_time = time.perf_counter_ns()
         self.logger.debug(f"Starting operation: {self.operation}", 
                          extra={'extra_fields': {'operation': self.operation, 'event': 'start'}})
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        duration = time.time() - self.start_time
+        duration = (time.perf_counter_ns() - self.start_time) / 1e9
         extra = {
             'operation': self.operation,
             'duration': duration,
@@ -136,6 +188,10 @@ class PerformanceProfiler:
         def decorator(func: Callable):
             @wraps(func)
             def wrapper(*args, **kwargs):
+                # isEnabledFor is cached by the logging module and reset on
+                # setLevel, so set_debug_mode still toggles profiling live
+                if not logger.isEnabledFor(logging.DEBUG):
+                    return func(*args, **kwargs)
                 with cls(logger, func.__name__):
                     return func(*args, **kwargs)
             return wrapper
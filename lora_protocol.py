@@ -1,16 +1,28 @@
+import os
 import queue
+import select
 import threading
 import time
-import json
-import zlib
+import collections
+import heapq
+import itertools
+import random
+import struct
 import logging
-from typing import Dict, Optional, List, Tuple
+from typing import Callable, Dict, Optional, List, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
+import numpy as np
 import serial
+from cobs import cobs
+from fastcrc import crc32 as _crc32
 from config import ConfigManager
 from logging_config import LoggerSetup, PerformanceProfiler
 
+# Binary packet header: message id, fragment id, total fragments, priority, CRC
+_HDR = struct.Struct('<QHHBI')
+_FRAME_DELIMITER = b'\x00'
+
 class MessagePriority(Enum):
     HIGH = 1    # Control messages, emergency signals
     MEDIUM = 2  # Regular telemetry, status updates
@@ -18,11 +30,15 @@ class MessagePriority(Enum):
 
 @dataclass
 class LoRaPacket:
-    message_id: str
+    # Explicit slots: no per-instance __dict__ on the per-fragment hot path
+    __slots__ = ('message_id', 'fragment_id', 'total_fragments', 'priority',
+                 'payload', 'crc', 'rssi', 'snr', 'timestamp')
+    
+    message_id: int
     fragment_id: int
     total_fragments: int
     priority: MessagePriority
-    payload: bytes
+    payload: bytes  # Any bytes-like object; fragments are memoryviews
     crc: int
     rssi: int
     snr: float
@@ -33,6 +49,12 @@ class LoRaProtocolHandler:
     HEADER_SIZE = 20       # Size reserved for packet header
     RETRY_LIMIT = 3        # Maximum retransmission attempts
     ACK_TIMEOUT = 2.0     # Acknowledgment timeout in seconds
+    SIGNAL_WINDOW = 100    # Packets kept for signal quality averages
+    SEND_BATCH_SIZE = 4    # Packets coalesced into one serial write
+    RX_CHUNK_SIZE = 4096   # Maximum bytes taken per serial read
+    
+    # Plain dict lookup instead of the Enum constructor on every received packet
+    _PRIO_BY_VAL = {p.value: p for p in MessagePriority}
 
     def __init__(self):
         # Initialize configuration
@@ -42,13 +64,24 @@ class LoRaProtocolHandler:
         self.log_setup = LoggerSetup()
         self.logger = self.log_setup.get_logger()
         
-        # Initialize queues
+        # Initialize queues: one deque per priority, drained by the send thread
         self.send_queue = {
-            MessagePriority.HIGH: queue.PriorityQueue(),
-            MessagePriority.MEDIUM: queue.PriorityQueue(),
-            MessagePriority.LOW: queue.PriorityQueue()
+            MessagePriority.HIGH: collections.deque(),
+            MessagePriority.MEDIUM: collections.deque(),
+            MessagePriority.LOW: collections.deque()
         }
+        self._send_event = threading.Event()
         self.receive_queue = queue.Queue()
+        self._rx_buf = bytearray()  # Received bytes not yet split into frames
+        self._rx_frames = queue.SimpleQueue()  # Frames handed to the packet worker
+        
+        # Broadcast deques; replaced wholesale on (un)subscribe so the packet
+        # worker can iterate without a lock
+        self._subscribers: Tuple[collections.deque, ...] = ()
+        
+        # Receive callbacks, replaced wholesale the same way; when any are
+        # registered they consume messages instead of the receive queue
+        self._receive_callbacks: Tuple[Callable[[bytes], None], ...] = ()
         
         # Initialize LoRa serial connection
         self.serial = serial.Serial(
@@ -56,24 +89,33 @@ class LoRaProtocolHandler:
             baudrate=self.config.get('hardware.lora.baud_rate', 115200),
             timeout=1
         )
+        self._serial_fd = self.serial.fileno()  # Raw fd for the steady-state RX/TX paths
         
         # Message tracking
         self.pending_acks = {}  # message_id -> timestamp
-        self.received_fragments = {}  # message_id -> {fragment_id: packet}
-        self.message_buffer = {}  # message_id -> original message
+        self._ack_heap = []  # (deadline, message_id), may hold stale entries
+        self.received_fragments = {}  # message_id -> [payload slots, received count]
+        self.message_buffer = {}  # message_id -> fragments, kept for retransmission
+        
+        # Message ids: 64-bit counter from a random start so restarts and
+        # peers don't collide; count.__next__ is atomic under the GIL
+        self._next_mid = itertools.count(random.getrandbits(63)).__next__
         
-        # Signal quality monitoring
+        # Signal quality monitoring: fixed-size ring buffers, one array per
+        # field; _sig_head counts every sample ever written
         self.signal_stats = {
-            'rssi': [],
-            'snr': [],
+            'rssi': np.zeros(self.SIGNAL_WINDOW, dtype=np.int16),
+            'snr': np.zeros(self.SIGNAL_WINDOW, dtype=np.float32),
             'packet_loss': 0,
             'retransmissions': 0
         }
+        self._sig_head = 0
         
         # Threading control
         self.running = False
         self.send_thread = None
         self.receive_thread = None
+        self.packet_thread = None
         
         # Register configuration observer
         self.config.register_observer(self._handle_config_change)
@@ -81,11 +123,18 @@ class LoRaProtocolHandler:
     def start(self):
         """Start the LoRa protocol handler"""
         if not self.running:
+            # stop() closes the port; a config change may also have reopened it
+            if not self.serial.is_open:
+                self.serial.open()
+            self._serial_fd = self.serial.fileno()
+            
             self.running = True
             self.send_thread = threading.Thread(target=self._send_loop)
             self.receive_thread = threading.Thread(target=self._receive_loop)
+            self.packet_thread = threading.Thread(target=self._packet_worker)
             self.send_thread.start()
             self.receive_thread.start()
+            self.packet_thread.start()
             self.logger.info("LoRa protocol handler started")
 
     def stop(self):
@@ -96,21 +145,24 @@ class LoRaProtocolHandler:
                 self.send_thread.join()
             if self.receive_thread:
                 self.receive_thread.join()
+            if self.packet_thread:
+                self.packet_thread.join()
             self.serial.close()
             self.logger.info("LoRa protocol handler stopped")
 
-    def send_message(self, message: str, priority: MessagePriority = MessagePriority.MEDIUM) -> str:
-        """Send a message with specified priority"""
+    def send_message(self, message: Union[str, bytes],
+                     priority: MessagePriority = MessagePriority.MEDIUM) -> int:
+        """Send a text or pre-encoded message with specified priority"""
         try:
-            message_id = f"{time.time()}_{hash(message) & 0xFFFFFFFF}"
-            fragments = self._fragment_message(message_id, message)
+            message_id = self._next_mid()
+            fragments = self._fragment_message(message_id, message, priority)
             
-            # Store original message for potential retransmission
-            self.message_buffer[message_id] = message
+            # Store fragments for potential retransmission
+            self.message_buffer[message_id] = fragments
             
             # Queue fragments for transmission
-            for fragment in fragments:
-                self.send_queue[priority].put((priority.value, fragment))
+            self.send_queue[priority].extend(fragments)
+            self._send_event.set()
             
             self.logger.info(f"Message queued for transmission: {message_id}")
             return message_id
@@ -119,55 +171,68 @@ class LoRaProtocolHandler:
             self.logger.error(f"Failed to send message: {e}")
             raise
 
-    def receive_message(self, timeout: float = None) -> Optional[str]:
-        """Receive a complete message"""
+    def receive_message(self, timeout: float = None) -> Optional[bytes]:
+        """Receive a complete message as raw bytes"""
         try:
             return self.receive_queue.get(timeout=timeout)
         except queue.Empty:
             return None
 
+    def subscribe(self, maxlen: Optional[int] = None) -> collections.deque:
+        """Get a deque that receives a copy of every complete message"""
+        subscriber = collections.deque(maxlen=maxlen)
+        self._subscribers = self._subscribers + (subscriber,)
+        return subscriber
+
+    def unsubscribe(self, subscriber: collections.deque):
+        """Stop delivering messages to a subscriber deque"""
+        self._subscribers = tuple(s for s in self._subscribers if s is not subscriber)
+
+    def register_receive_callback(self, callback: Callable[[bytes], None]):
+        """Call callback with every complete message from the packet worker"""
+        self._receive_callbacks = self._receive_callbacks + (callback,)
+
+    def unregister_receive_callback(self, callback: Callable[[bytes], None]):
+        """Stop calling a receive callback"""
+        self._receive_callbacks = tuple(c for c in self._receive_callbacks if c != callback)
+
+    @property
+    def total_queued_fragments(self) -> int:
+        """Number of fragments waiting in all send queues"""
+        # deque length is O(1) and lock-free, so no separate counter is kept
+        return sum(len(pending) for pending in self.send_queue.values())
+
     def get_signal_quality(self) -> Dict:
         """Get signal quality statistics"""
-        if not self.signal_stats['rssi']:
+        count = min(self._sig_head, self.SIGNAL_WINDOW)
+        if not count:
             return {}
         
         return {
-            'rssi_avg': sum(self.signal_stats['rssi']) / len(self.signal_stats['rssi']),
-            'snr_avg': sum(self.signal_stats['snr']) / len(self.signal_stats['snr']),
+            'rssi_avg': float(self.signal_stats['rssi'][:count].mean()),
+            'snr_avg': float(self.signal_stats['snr'][:count].mean()),
             'packet_loss': self.signal_stats['packet_loss'],
             'retransmissions': self.signal_stats['retransmissions']
         }
 
-    def _fragment_message(self, message_id: str, message: str) -> List[LoRaPacket]:
+    def _fragment_message(self, message_id: int, message: Union[str, bytes],
+                          priority: MessagePriority = MessagePriority.MEDIUM) -> List[LoRaPacket]:
         """Fragment large messages into LoRa packets"""
-        data = message.encode()
+        data = memoryview(message.encode() if isinstance(message, str) else message)
         payload_size = self.MAX_PACKET_SIZE - self.HEADER_SIZE
-        fragments = []
         
-        # Calculate total fragments
-        total_fragments = (len(data) + payload_size - 1) // payload_size
+        # Zero-copy split; fragments are views until _frame_packet copies them
+        # into the wire buffer
+        chunks = [data[start:start + payload_size] for start in range(0, len(data), payload_size)]
+        total_fragments = len(chunks)
+        timestamp = time.time()
+        crc32 = _crc32.iso_hdlc
         
-        for i in range(total_fragments):
-            start = i * payload_size
-            end = start + payload_size
-            fragment = data[start:end]
-            
-            # Create packet
-            packet = LoRaPacket(
-                message_id=message_id,
-                fragment_id=i,
-                total_fragments=total_fragments,
-                priority=MessagePriority.MEDIUM,
-                payload=fragment,
-                crc=zlib.crc32(fragment),
-                rssi=0,
-                snr=0.0,
-                timestamp=time.time()
-            )
-            
-            fragments.append(packet)
-        
-        return fragments
+        return [
+            LoRaPacket(message_id, i, total_fragments, priority, chunk,
+                       crc32(chunk), 0, 0.0, timestamp)
+            for i, chunk in enumerate(chunks)
+        ]
 
     def _send_loop(self):
         """Main sending loop"""
@@ -176,14 +241,21 @@ class LoRaProtocolHandler:
                 # Check pending acknowledgments
                 self._check_pending_acks()
                 
-                # Try to send from high priority queue first
+                # Clear before draining so a concurrent set() is never lost
+                self._send_event.clear()
+                
+                # Drain a batch, high priority queue first
+                batch = []
                 for priority in MessagePriority:
-                    if not self.send_queue[priority].empty():
-                        _, packet = self.send_queue[priority].get_nowait()
-                        self._send_packet(packet)
-                        break
+                    pending = self.send_queue[priority]
+                    while pending and len(batch) < self.SEND_BATCH_SIZE:
+                        batch.append(pending.popleft())
                 
-                time.sleep(0.01)  # Prevent busy waiting
+                if batch:
+                    self._send_packets(batch)
+                else:
+                    # All queues empty: sleep until work arrives or acks are due
+                    self._send_event.wait(0.01)
                 
             except Exception as e:
                 self.logger.error(f"Error in send loop: {e}")
@@ -193,56 +265,114 @@ class LoRaProtocolHandler:
         """Main receiving loop"""
         while self.running:
             try:
-                if self.serial.in_waiting:
-                    data = self.serial.readline()
-                    packet = self._parse_packet(data)
-                    
-                    if packet:
-                        self._handle_packet(packet)
+                # Block on the fd until data arrives; the timeout only bounds
+                # how long stop() waits for this thread
+                readable, _, _ = select.select((self._serial_fd,), (), (), 0.1)
+                if not readable:
+                    continue
+                
+                try:
+                    chunk = os.read(self._serial_fd, self.RX_CHUNK_SIZE)
+                except BlockingIOError:
+                    continue
+                if not chunk:
+                    raise serial.SerialException("device reports readiness to read but returned no data")
+                
+                # Split out complete frames
+                rx_buf = self._rx_buf
+                rx_buf += chunk
+                
+                # Parsing happens on the packet worker so reads keep up with the UART
+                while (end := rx_buf.find(0)) >= 0:
+                    if end:
+                        self._rx_frames.put_nowait(bytes(rx_buf[:end]))
+                    del rx_buf[:end + 1]
                 
             except Exception as e:
                 self.logger.error(f"Error in receive loop: {e}")
                 time.sleep(1)
 
-    def _send_packet(self, packet: LoRaPacket):
-        """Send a single packet"""
-        try:
-            # Prepare packet data
-            packet_data = {
-                'id': packet.message_id,
-                'frag': packet.fragment_id,
-                'total': packet.total_fragments,
-                'priority': packet.priority.value,
-                'payload': packet.payload.hex(),
-                'crc': packet.crc
-            }
+    def _packet_worker(self):
+        """Parse and handle frames handed off by the receive loop"""
+        while self.running:
+            try:
+                frame = self._rx_frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
             
-            # Send packet
-            data = json.dumps(packet_data).encode()
-            self.serial.write(data + b'\n')
+            try:
+                packet = self._parse_packet(frame)
+                if packet:
+                    self._handle_packet(packet)
+                
+            except Exception as e:
+                self.logger.error(f"Error handling packet: {e}")
+
+    def _frame_packet(self, packet: LoRaPacket, out: bytearray):
+        """Append a COBS-framed packet to an outgoing write buffer"""
+        # cobs.encode rejects memoryviews and returns new bytes anyway, so
+        # header and payload are simply joined for it
+        raw = _HDR.pack(
+            packet.message_id,
+            packet.fragment_id,
+            packet.total_fragments,
+            packet.priority.value,
+            packet.crc
+        ) + packet.payload
+        
+        # Zero bytes only appear as delimiters
+        out += cobs.encode(raw)
+        out += _FRAME_DELIMITER
+
+    def _send_packets(self, packets: List[LoRaPacket]):
+        """Send a batch of packets with a single serial write"""
+        try:
+            out = bytearray()
+            for packet in packets:
+                self._frame_packet(packet, out)
+            self._write_all(out)
             
             # Track for acknowledgment
-            self.pending_acks[packet.message_id] = time.time()
+            now = time.time()
+            deadline = now + self.ACK_TIMEOUT
+            for packet in packets:
+                self.pending_acks[packet.message_id] = now
+                heapq.heappush(self._ack_heap, (deadline, packet.message_id))
             
         except Exception as e:
-            self.logger.error(f"Failed to send packet: {e}")
+            self.logger.error(f"Failed to send packets: {e}")
             # Queue for retransmission
-            self.send_queue[packet.priority].put((packet.priority.value, packet))
+            for packet in packets:
+                self.send_queue[packet.priority].append(packet)
+            self._send_event.set()
+
+    def _write_all(self, data: bytearray):
+        """Write a buffer straight to the serial fd, bypassing pyserial"""
+        view = memoryview(data)
+        while view:
+            try:
+                written = os.write(self._serial_fd, view)
+            except BlockingIOError:
+                # Port is opened non-blocking: wait for the driver to drain
+                select.select((), (self._serial_fd,), (), 1.0)
+                continue
+            view = view[written:]
 
     def _parse_packet(self, data: bytes) -> Optional[LoRaPacket]:
-        """Parse received packet data"""
+        """Parse a received COBS frame (without its delimiter)"""
         try:
-            packet_data = json.loads(data.decode())
+            buf = cobs.decode(data)
+            message_id, fragment_id, total_fragments, priority, crc = _HDR.unpack_from(buf, 0)
             
             return LoRaPacket(
-                message_id=packet_data['id'],
-                fragment_id=packet_data['frag'],
-                total_fragments=packet_data['total'],
-                priority=MessagePriority(packet_data['priority']),
-                payload=bytes.fromhex(packet_data['payload']),
-                crc=packet_data['crc'],
-                rssi=packet_data.get('rssi', 0),
-                snr=packet_data.get('snr', 0.0),
+                message_id=message_id,
+                fragment_id=fragment_id,
+                total_fragments=total_fragments,
+                priority=self._PRIO_BY_VAL[priority],
+                payload=memoryview(buf)[_HDR.size:],
+                crc=crc,
+                rssi=0,
+                snr=0.0,
                 timestamp=time.time()
             )
             
@@ -253,62 +383,80 @@ class LoRaProtocolHandler:
     def _handle_packet(self, packet: LoRaPacket):
         """Handle received packet"""
         # Validate CRC
-        if zlib.crc32(packet.payload) != packet.crc:
+        if _crc32.iso_hdlc(packet.payload) != packet.crc:
             self.logger.warning(f"CRC validation failed for packet: {packet.message_id}")
             self.signal_stats['packet_loss'] += 1
             return
         
-        # Update signal statistics
-        self.signal_stats['rssi'].append(packet.rssi)
-        self.signal_stats['snr'].append(packet.snr)
-        if len(self.signal_stats['rssi']) > 100:
-            self.signal_stats['rssi'] = self.signal_stats['rssi'][-100:]
-            self.signal_stats['snr'] = self.signal_stats['snr'][-100:]
+        # Update signal statistics, overwriting the oldest sample once full
+        slot = self._sig_head % self.SIGNAL_WINDOW
+        self.signal_stats['rssi'][slot] = packet.rssi
+        self.signal_stats['snr'][slot] = packet.snr
+        self._sig_head += 1
         
-        # Handle acknowledgment
-        if packet.message_id in self.pending_acks:
-            del self.pending_acks[packet.message_id]
+        # Handle acknowledgment: one dict operation instead of test + delete
+        message_id = packet.message_id
+        if self.pending_acks.pop(message_id, None) is not None:
             return
         
-        # Store fragment
-        if packet.message_id not in self.received_fragments:
-            self.received_fragments[packet.message_id] = {}
-        
-        self.received_fragments[packet.message_id][packet.fragment_id] = packet
+        # Store fragment payload in its slot; total is known from any fragment,
+        # and the entry is only built for the first one to arrive
+        entry = self.received_fragments.get(message_id)
+        if entry is None:
+            entry = self.received_fragments[message_id] = [[None] * packet.total_fragments, 0]
+        slots = entry[0]
+        fragment_id = packet.fragment_id
+        entry[1] += slots[fragment_id] is None  # Duplicates don't count twice
+        slots[fragment_id] = packet.payload
         
         # Check if message is complete
-        if len(self.received_fragments[packet.message_id]) == packet.total_fragments:
-            self._reassemble_message(packet.message_id)
+        if entry[1] == len(slots):
+            self._reassemble_message(message_id)
 
-    def _reassemble_message(self, message_id: str):
+    def _reassemble_message(self, message_id: int):
         """Reassemble complete message from fragments"""
         try:
-            fragments = self.received_fragments[message_id]
-            ordered_fragments = [fragments[i].payload for i in range(len(fragments))]
-            message = b''.join(ordered_fragments).decode()
-            
-            # Put complete message in receive queue
-            self.receive_queue.put(message)
+            slots, _ = self.received_fragments[message_id]
+            message = b''.join(slots)  # Callers decode if they need text
             
             # Cleanup
             del self.received_fragments[message_id]
             
+            self._dispatch_message(message)
+            
         except Exception as e:
             self.logger.error(f"Failed to reassemble message: {e}")
 
+    def _dispatch_message(self, message: bytes):
+        """Hand a complete message to callbacks or the receive queue, and to subscribers"""
+        callbacks = self._receive_callbacks
+        if callbacks:
+            for callback in callbacks:
+                callback(message)
+        else:
+            self.receive_queue.put(message)
+        for subscriber in self._subscribers:
+            subscriber.append(message)
+
     def _check_pending_acks(self):
         """Check for timed out packets and handle retransmission"""
         current_time = time.time()
-        for message_id, timestamp in list(self.pending_acks.items()):
-            if current_time - timestamp > self.ACK_TIMEOUT:
-                if message_id in self.message_buffer:
-                    self.signal_stats['retransmissions'] += 1
-                    # Retransmit with high priority
-                    self.send_message(
-                        self.message_buffer[message_id],
-                        priority=MessagePriority.HIGH
-                    )
-                del self.pending_acks[message_id]
+        heap = self._ack_heap
+        while heap and heap[0][0] <= current_time:
+            _, message_id = heapq.heappop(heap)
+            
+            # Skip entries that were acknowledged or re-sent since they were pushed
+            timestamp = self.pending_acks.get(message_id)
+            if timestamp is None or current_time - timestamp < self.ACK_TIMEOUT:
+                continue
+            
+            fragments = self.message_buffer.get(message_id)
+            if fragments is not None:
+                self.signal_stats['retransmissions'] += 1
+                # Retransmit the already-built fragments with high priority
+                self.send_queue[MessagePriority.HIGH].extend(fragments)
+                self._send_event.set()
+            self.pending_acks.pop(message_id, None)
 
     def _handle_config_change(self, new_config: Dict):
         """Handle configuration changes"""
@@ -342,7 +490,7 @@ if __name__ == '__main__':
     while True:
         message = handler.receive_message(timeout=1.0)
         if message:
-            print(f"Received: {message}")
+            print(f"Received: {message.decode(errors='replace')}")
         
         # Print signal quality
         print("Signal Quality:", handler.get_signal_quality())
@@ -1,7 +1,8 @@
 import serial
 import time
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import orjson
 from typing import Optional
 import logging
 
@@ -26,6 +27,12 @@ class LoRaReceiver:
         self.server_url = server_url
         self.serial_connection: Optional[serial.Serial] = None
         
+        # Persistent keep-alive session so mode updates reuse one connection
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        self._http.mount('http://', adapter)
+        self._http.mount('https://', adapter)
+        
     def connect(self) -> bool:
         """Establish connection with the LoRa device."""
         try:
@@ -57,7 +64,7 @@ class LoRaReceiver:
     def update_server_mode(self, mode: int) -> bool:
         """Send mode update to Flask server."""
         try:
-            response = requests.post(
+            response = self._http.post(
                 f"{self.server_url}/mode",
                 json={"mode": mode},
                 timeout=5
@@ -76,14 +83,14 @@ class LoRaReceiver:
         """Process received LoRa data and update server if necessary."""
         try:
             # Assuming LoRa data is JSON formatted with a 'mode' field
-            parsed_data = json.loads(data)
+            parsed_data = orjson.loads(data)
             if 'mode' in parsed_data:
                 mode = int(parsed_data['mode'])
                 if mode in [1, 2, 3]:
                     self.update_server_mode(mode)
                 else:
                     logger.warning(f"Received invalid mode value: {mode}")
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"Failed to parse LoRa data: {data}")
         except ValueError:
             logger.error(f"Invalid mode format in data: {data}")
@@ -111,6 +118,7 @@ class LoRaReceiver:
         # Cleanup
         if self.serial_connection:
             self.serial_connection.close()
+        self._http.close()
             
 if __name__ == "__main__":
     import argparse
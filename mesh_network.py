@@ -1,36 +1,66 @@
 import time
-import json
+import math
+import heapq
+import struct
 import threading
 import logging
 from typing import Dict, List, Set, Optional, Tuple
-from dataclasses import dataclass
-from enum import Enum
+from dataclasses import dataclass, replace
+from enum import IntEnum
+import msgpack
 import networkx as nx
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
 from lora_protocol import LoRaProtocolHandler, MessagePriority
 from config import ConfigManager
 from logging_config import LoggerSetup
 
+# Heartbeats are fixed-shape, so they skip msgpack: tag, node id, timestamp.
+# 0xC1 is never a valid first byte of a msgpack object, so the tag alone
+# tells the two encodings apart.
+HEARTBEAT_TAG = 0xC1
+_HEARTBEAT = struct.Struct('<B16sd')
+
 @dataclass
 class Node:
+    # Explicit slots: no per-instance __dict__, and heartbeats store to a slot
+    __slots__ = ('id', 'last_seen', 'rssi', 'snr', 'hop_count',
+                 'battery_level', 'is_gateway')
+    
     id: str
-    last_seen: float
+    last_seen: float  # time.monotonic() seconds, at CLOCK_TICK resolution
     rssi: int
     snr: float
     hop_count: int
     battery_level: float
-    is_gateway: bool = False
+    is_gateway: bool
+
+@dataclass(frozen=True)
+class RoutingSnapshot:
+    """Immutable view of the routing state, swapped in whole by writers"""
+    nodes: Dict[str, Node]             # node_id -> Node
+    routing_table: Dict[str, str]      # destination -> next_hop
+    graph: nx.Graph
+    path_lengths: Dict[str, int]       # node_id -> hop count from this node
+    version: int                       # Bumped on every topology change
 
-class MessageType(Enum):
-    DISCOVERY = "discovery"
-    HEARTBEAT = "heartbeat"
-    ROUTE_UPDATE = "route_update"
-    DATA = "data"
+class MessageType(IntEnum):
+    # Dense integer tags: they index the dispatch table directly
+    DISCOVERY = 0
+    HEARTBEAT = 1
+    ROUTE_UPDATE = 2
+    DATA = 3
 
 class MeshNetworkManager:
     DISCOVERY_INTERVAL = 60  # Seconds between discovery broadcasts
     HEARTBEAT_INTERVAL = 30  # Seconds between heartbeats
     NODE_TIMEOUT = 180      # Seconds before considering a node offline
     MAX_HOPS = 5           # Maximum number of hops for routing
+    CLOCK_TICK = 0.1       # Resolution of the coarse liveness clock
+    CLEANUP_INTERVAL = 10  # Seconds between inactive-node sweeps
+    ROUTE_FLUSH_INTERVAL = 1  # Seconds between debounced route rebuilds
+    LINK_WEIGHT_TOLERANCE = 0.05  # Relative link weight change that reroutes
+    NODE_LOCK_SHARDS = 16  # Power of two, so a node id maps to a shard by mask
     
     def __init__(self, node_id: str, is_gateway: bool = False):
         # Initialize configuration and logging
@@ -45,10 +75,49 @@ class MeshNetworkManager:
         # Initialize LoRa protocol handler
         self.lora = LoRaProtocolHandler()
         
-        # Network state
-        self.nodes: Dict[str, Node] = {}  # node_id -> Node
-        self.routing_table: Dict[str, str] = {}  # destination -> next_hop
-        self.network_graph = nx.Graph()
+        # Invariant msgpack prefix of the discovery broadcast (a 5-entry
+        # map); only the trailing values are packed per send
+        self._discovery_prefix = b'\x85' + b''.join(
+            msgpack.packb(item, use_bin_type=True) for item in (
+                'type', MessageType.DISCOVERY.value,
+                'node_id', node_id,
+                'is_gateway', is_gateway,
+                'battery_level'
+            )
+        )
+        self._timestamp_key = msgpack.packb('timestamp', use_bin_type=True)
+        
+        # One packer reused for every message; its internal buffer is kept
+        # between calls, unlike msgpack.packb which builds a packer each time
+        self._packer = msgpack.Packer(use_bin_type=True)
+        self._packer_lock = threading.Lock()
+        
+        # Node ids that don't fit the fixed heartbeat field fall back to msgpack
+        self._heartbeat_id = node_id.encode()
+        if len(self._heartbeat_id) > 16:
+            self._heartbeat_id = None
+        
+        # Network state: readers take self._snapshot once and never lock;
+        # writers build a new snapshot under the lock and swap the reference
+        self._snapshot = RoutingSnapshot(
+            nodes={},
+            routing_table={},
+            graph=nx.Graph(),
+            path_lengths={},
+            version=0
+        )
+        self._writer_lock = threading.Lock()
+        self._routes_dirty = False  # Topology changed since routes were built
+        
+        # Per-node fields (liveness, signal, battery) are updated in place
+        # under a lock sharded by node id, so updates for different nodes
+        # don't contend with each other or with topology writers
+        self._node_locks = [threading.Lock() for _ in range(self.NODE_LOCK_SHARDS)]
+        
+        # Min-heap of (last_seen, node_id) for expiry; an entry is stale once
+        # the node has been seen again or removed, and is dropped when popped
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._expiry_lock = threading.Lock()
         
         # Message handling
         self.message_handlers = {
@@ -57,42 +126,61 @@ class MeshNetworkManager:
             MessageType.ROUTE_UPDATE: self._handle_route_update,
             MessageType.DATA: self._handle_data
         }
+        self._handlers_by_tag = [self.message_handlers[tag] for tag in MessageType]
         
         # Threading control
         self.running = False
-        self.discovery_thread = None
-        self.heartbeat_thread = None
-        self.cleanup_thread = None
+        self.scheduler_thread = None
+        
+        # Coarse monotonic clock for liveness tracking, refreshed by the
+        # scheduler instead of a clock call per message
+        self._now = time.monotonic()
         
         # Statistics
         self.stats = {
             'messages_forwarded': 0,
             'route_updates': 0,
             'active_nodes': 0,
-            'total_bandwidth': 0
+            'total_bandwidth': 0,
+            'invalid_messages': 0
         }
 
+    @property
+    def nodes(self) -> Dict[str, Node]:
+        """Known nodes from the current snapshot (do not mutate)"""
+        return self._snapshot.nodes
+
+    @property
+    def routing_table(self) -> Dict[str, str]:
+        """Routing table from the current snapshot (do not mutate)"""
+        return self._snapshot.routing_table
+
+    @property
+    def network_graph(self) -> nx.Graph:
+        """Network graph from the current snapshot (do not mutate)"""
+        return self._snapshot.graph
+
     def start(self):
         """Start the mesh network manager"""
         if not self.running:
             self.running = True
-            self.lora.start()
             
-            # Start management threads
-            self.discovery_thread = threading.Thread(target=self._discovery_loop)
-            self.heartbeat_thread = threading.Thread(target=self._heartbeat_loop)
-            self.cleanup_thread = threading.Thread(target=self._cleanup_loop)
+            # Messages are dispatched from the LoRa packet worker as they
+            # complete, so no thread polls for them
+            self.lora.register_receive_callback(self._on_message)
+            self.lora.start()
             
-            self.discovery_thread.start()
-            self.heartbeat_thread.start()
-            self.cleanup_thread.start()
+            # Start the management thread
+            self._now = time.monotonic()
+            self.scheduler_thread = threading.Thread(target=self._scheduler_loop)
+            self.scheduler_thread.start()
             
             # Register self as a node
             self._register_node(
                 self.node_id,
                 Node(
                     id=self.node_id,
-                    last_seen=time.time(),
+                    last_seen=self._now,
                     rssi=0,
                     snr=0,
                     hop_count=0,
@@ -108,24 +196,21 @@ class MeshNetworkManager:
         if self.running:
             self.running = False
             self.lora.stop()
+            self.lora.unregister_receive_callback(self._on_message)
             
-            if self.discovery_thread:
-                self.discovery_thread.join()
-            if self.heartbeat_thread:
-                self.heartbeat_thread.join()
-            if self.cleanup_thread:
-                self.cleanup_thread.join()
+            if self.scheduler_thread:
+                self.scheduler_thread.join()
             
             self.logger.info("Mesh network manager stopped")
 
     def send_message(self, destination: str, message: str, priority: MessagePriority = MessagePriority.MEDIUM):
         """Send a message to a destination node"""
         try:
-            if destination not in self.routing_table:
+            next_hop = self._snapshot.routing_table.get(destination)
+            if next_hop is None:
                 self.logger.warning(f"No route to destination: {destination}")
                 return False
             
-            next_hop = self.routing_table[destination]
             message_data = {
                 'type': MessageType.DATA.value,
                 'source': self.node_id,
@@ -134,8 +219,9 @@ class MeshNetworkManager:
                 'payload': message
             }
             
-            self.lora.send_message(json.dumps(message_data), priority)
-            self.stats['total_bandwidth'] += len(message.encode())
+            packed = self._pack(message_data)
+            self.lora.send_message(packed, priority)
+            self.stats['total_bandwidth'] += len(packed)
             return True
             
         except Exception as e:
@@ -144,182 +230,299 @@ class MeshNetworkManager:
 
     def get_network_topology(self) -> Dict:
         """Get current network topology information"""
+        snapshot = self._snapshot
         return {
-            'nodes': len(self.nodes),
-            'active_nodes': sum(1 for n in self.nodes.values() 
-                              if time.time() - n.last_seen < self.NODE_TIMEOUT),
-            'routes': len(self.routing_table),
-            'gateway_nodes': sum(1 for n in self.nodes.values() if n.is_gateway),
+            'nodes': len(snapshot.nodes),
+            'active_nodes': sum(1 for n in snapshot.nodes.values() 
+                              if self._now - n.last_seen < self.NODE_TIMEOUT),
+            'routes': len(snapshot.routing_table),
+            'gateway_nodes': sum(1 for n in snapshot.nodes.values() if n.is_gateway),
             'stats': self.stats
         }
 
-    def _discovery_loop(self):
-        """Periodic network discovery broadcast"""
+    def _scheduler_loop(self):
+        """Run all periodic tasks from one thread, driven by a timer heap"""
+        now = time.monotonic()
+        timers = [
+            (now, 0, self.CLOCK_TICK, self._tick_clock),
+            (now, 1, self.DISCOVERY_INTERVAL, self._send_discovery),
+            (now, 2, self.HEARTBEAT_INTERVAL, self._send_heartbeat),
+            (now, 3, self.CLEANUP_INTERVAL, self._cleanup_nodes),
+            (now, 4, self.ROUTE_FLUSH_INTERVAL, self._flush_routes)
+        ]
+        heapq.heapify(timers)
+        
         while self.running:
+            fire_at, seq, interval, task = timers[0]
+            now = time.monotonic()
+            if fire_at > now:
+                # The clock tick keeps every sleep short enough for stop()
+                time.sleep(fire_at - now)
+                continue
+            
+            # Reschedule before running; skip missed slots instead of bursting
+            next_at = fire_at + interval
+            if next_at <= now:
+                next_at = now + interval
+            heapq.heapreplace(timers, (next_at, seq, interval, task))
+            
             try:
-                discovery_data = {
-                    'type': MessageType.DISCOVERY.value,
-                    'node_id': self.node_id,
-                    'is_gateway': self.is_gateway,
-                    'battery_level': 1.0,  # TODO: Implement actual battery monitoring
-                    'timestamp': time.time()
-                }
-                
-                self.lora.send_message(
-                    json.dumps(discovery_data),
-                    MessagePriority.LOW
-                )
-                
-                time.sleep(self.DISCOVERY_INTERVAL)
-                
+                task()
             except Exception as e:
-                self.logger.error(f"Error in discovery loop: {e}")
-                time.sleep(1)
+                self.logger.error(f"Error in scheduled task {task.__name__}: {e}")
 
-    def _heartbeat_loop(self):
-        """Periodic heartbeat broadcast"""
-        while self.running:
-            try:
-                heartbeat_data = {
-                    'type': MessageType.HEARTBEAT.value,
-                    'node_id': self.node_id,
-                    'timestamp': time.time()
-                }
-                
-                self.lora.send_message(
-                    json.dumps(heartbeat_data),
-                    MessagePriority.LOW
-                )
-                
-                time.sleep(self.HEARTBEAT_INTERVAL)
-                
-            except Exception as e:
-                self.logger.error(f"Error in heartbeat loop: {e}")
-                time.sleep(1)
+    def _tick_clock(self):
+        """Refresh the coarse monotonic clock"""
+        self._now = time.monotonic()
 
-    def _cleanup_loop(self):
-        """Periodic cleanup of inactive nodes"""
-        while self.running:
-            try:
-                current_time = time.time()
-                inactive_nodes = [
-                    node_id for node_id, node in self.nodes.items()
-                    if current_time - node.last_seen > self.NODE_TIMEOUT
-                    and node_id != self.node_id
-                ]
-                
-                for node_id in inactive_nodes:
-                    self._remove_node(node_id)
-                
-                self.stats['active_nodes'] = len(self.nodes) - len(inactive_nodes)
-                time.sleep(10)  # Check every 10 seconds
-                
-            except Exception as e:
-                self.logger.error(f"Error in cleanup loop: {e}")
-                time.sleep(1)
+    def _send_discovery(self):
+        """Network discovery broadcast"""
+        battery_level = 1.0  # TODO: Implement actual battery monitoring
+        discovery_data = b''.join((
+            self._discovery_prefix,
+            self._pack(battery_level),
+            self._timestamp_key,
+            self._pack(time.time())
+        ))
+        
+        self.lora.send_message(discovery_data, MessagePriority.LOW)
+
+    def _send_heartbeat(self):
+        """Heartbeat broadcast"""
+        if self._heartbeat_id is not None:
+            heartbeat_data = _HEARTBEAT.pack(HEARTBEAT_TAG, self._heartbeat_id, time.time())
+        else:
+            heartbeat_data = self._pack({
+                'type': MessageType.HEARTBEAT.value,
+                'node_id': self.node_id,
+                'timestamp': time.time()
+            })
+        
+        self.lora.send_message(heartbeat_data, MessagePriority.LOW)
 
-    def _register_node(self, node_id: str, node: Node):
-        """Register a new node in the network"""
-        self.nodes[node_id] = node
-        self.network_graph.add_node(node_id)
-        self._update_routing_table()
+    def _cleanup_nodes(self):
+        """Cleanup of inactive nodes"""
+        deadline = self._now - self.NODE_TIMEOUT
+        expired = []
+        with self._expiry_lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] < deadline:
+                expired.append(heapq.heappop(heap))
+        
+        for last_seen, node_id in expired:
+            node = self._snapshot.nodes.get(node_id)
+            if node is not None and node.last_seen == last_seen:
+                self._remove_node(node_id)
+        
+        self.stats['active_nodes'] = len(self._snapshot.nodes)
+
+    def _track_expiry(self, node_id: str, last_seen: float):
+        """Schedule a node for expiry NODE_TIMEOUT after last_seen"""
+        if node_id != self.node_id:
+            with self._expiry_lock:
+                heapq.heappush(self._expiry_heap, (last_seen, node_id))
+
+    def _register_node(self, node_id: str, node: Node, link_weight: Optional[float] = None):
+        """Register a new node in the network, optionally linked to this node"""
+        with self._writer_lock:
+            snapshot = self._snapshot
+            graph = snapshot.graph.copy()
+            graph.add_node(node_id)
+            if link_weight is not None:
+                graph.add_edge(self.node_id, node_id, weight=link_weight)
+            
+            self._publish_topology({**snapshot.nodes, node_id: node}, graph)
+        
+        self._track_expiry(node_id, node.last_seen)
 
     def _remove_node(self, node_id: str):
         """Remove a node from the network"""
-        if node_id in self.nodes:
-            del self.nodes[node_id]
-            self.network_graph.remove_node(node_id)
+        with self._writer_lock:
+            snapshot = self._snapshot
+            if node_id not in snapshot.nodes:
+                return
+            
+            nodes = dict(snapshot.nodes)
+            del nodes[node_id]
+            graph = snapshot.graph.copy()
+            graph.remove_node(node_id)
+            
+            self._publish_topology(nodes, graph)
+        
+        self.logger.info(f"Node removed from network: {node_id}")
+
+    def _publish_topology(self, nodes: Dict[str, Node], graph: nx.Graph):
+        """Swap in a snapshot for a new topology; caller holds the writer lock"""
+        snapshot = self._snapshot
+        
+        # Routes are left as they are and rebuilt by the next flush, so a
+        # burst of node events costs one route computation
+        self._snapshot = replace(snapshot, nodes=nodes, graph=graph, version=snapshot.version + 1)
+        self._routes_dirty = True
+
+    def _flush_routes(self):
+        """Rebuild routes if the topology changed since the last rebuild"""
+        if self._routes_dirty:
             self._update_routing_table()
-            self.logger.info(f"Node removed from network: {node_id}")
 
     def _update_routing_table(self):
         """Update routing table based on current network topology"""
-        try:
-            new_routing_table = {}
+        with self._writer_lock:
+            snapshot = self._snapshot
+            self._routes_dirty = False
+            try:
+                routing_table, path_lengths = self._compute_routes(snapshot.graph)
+            except Exception as e:
+                self.logger.error(f"Failed to update routing table: {e}")
+                return
             
-            # Find shortest paths to all nodes
-            for dest_id in self.nodes:
-                if dest_id == self.node_id:
-                    continue
-                
-                try:
-                    path = nx.shortest_path(
-                        self.network_graph,
-                        self.node_id,
-                        dest_id,
-                        weight='weight'
-                    )
-                    
-                    if len(path) <= self.MAX_HOPS:
-                        new_routing_table[dest_id] = path[1]  # Next hop
-                
-                except nx.NetworkXNoPath:
-                    continue
+            # Single reference assignment: readers see the old or new state, never a mix
+            self._snapshot = replace(
+                snapshot,
+                routing_table=routing_table,
+                path_lengths=path_lengths
+            )
+        
+        # Broadcast outside the lock
+        if routing_table != snapshot.routing_table:
+            self.stats['route_updates'] += 1
+            self._broadcast_routes()
+
+    def _broadcast_routes(self):
+        """Broadcast the current routing table"""
+        try:
+            update_data = {
+                'type': MessageType.ROUTE_UPDATE.value,
+                'node_id': self.node_id,
+                'routes': list(self._snapshot.routing_table.items()),
+                'timestamp': time.time()
+            }
             
-            # Update routing table if changes detected
-            if new_routing_table != self.routing_table:
-                self.routing_table = new_routing_table
-                self.stats['route_updates'] += 1
-                
-                # Broadcast route update
-                update_data = {
-                    'type': MessageType.ROUTE_UPDATE.value,
-                    'node_id': self.node_id,
-                    'routes': list(self.routing_table.items()),
-                    'timestamp': time.time()
-                }
-                
-                self.lora.send_message(
-                    json.dumps(update_data),
-                    MessagePriority.MEDIUM
-                )
+            self.lora.send_message(
+                self._pack(update_data),
+                MessagePriority.MEDIUM
+            )
             
         except Exception as e:
-            self.logger.error(f"Failed to update routing table: {e}")
+            self.logger.error(f"Failed to broadcast route update: {e}")
+
+    def _compute_routes(self, graph: nx.Graph) -> Tuple[Dict[str, str], Dict[str, int]]:
+        """Next hop and hop count to every reachable node"""
+        if self.node_id not in graph:
+            return {}, {}
+        
+        # Flatten the graph to CSR once per topology and run the searches in
+        # scipy; NetworkX stays the editable/exportable representation
+        node_list = list(graph)
+        source = node_list.index(self.node_id)
+        csr = nx.to_scipy_sparse_array(graph, nodelist=node_list, weight='weight', format='csr')
+        dist, pred = dijkstra(csr, directed=False, indices=source, return_predecessors=True)
+        hops = dijkstra(csr, directed=False, indices=source, unweighted=True)
+        
+        # Resolve next hops in order of distance, so each predecessor is
+        # already resolved when its successors are visited. Unreachable
+        # nodes have infinite distance and sort last, so only the reachable
+        # prefix is walked.
+        order = np.argsort(dist)
+        reachable = int(np.count_nonzero(np.isfinite(dist)))
+        next_hop = {source: source}
+        path_hops = {source: 0}
+        routes = {}
+        for index in order[:reachable]:
+            if index == source:
+                continue
+            parent = pred[index]
+            next_hop[index] = index if parent == source else next_hop[parent]
+            path_hops[index] = path_hops[parent] + 1
+            if path_hops[index] < self.MAX_HOPS:
+                routes[node_list[index]] = node_list[next_hop[index]]
+        
+        # Unweighted hop counts for vetting routes learned from neighbours
+        path_lengths = {
+            node_list[index]: int(count)
+            for index, count in enumerate(hops)
+            if np.isfinite(count)
+        }
+        
+        return routes, path_lengths
+
+    def _node_lock(self, node_id: str) -> threading.Lock:
+        """Lock guarding the in-place fields of a node"""
+        return self._node_locks[hash(node_id) & (self.NODE_LOCK_SHARDS - 1)]
 
     def _handle_discovery(self, data: Dict):
         """Handle discovery messages"""
         node_id = data['node_id']
         if node_id != self.node_id:
             signal_quality = self.lora.get_signal_quality()
+            rssi = signal_quality.get('rssi_avg', 0)
+            weight = 1.0 / (abs(rssi) + 1)  # Better RSSI = lower weight
+            
+            # A known node whose link weight has only drifted is refreshed in
+            # place, without copying the topology or rebuilding routes
+            snapshot = self._snapshot
+            node = snapshot.nodes.get(node_id)
+            if node is not None:
+                edge = snapshot.graph.get_edge_data(self.node_id, node_id)
+                if edge is not None and math.isclose(
+                    edge['weight'], weight, rel_tol=self.LINK_WEIGHT_TOLERANCE
+                ):
+                    with self._node_lock(node_id):
+                        self._refresh_last_seen(node)
+                        node.rssi = rssi
+                        node.snr = signal_quality.get('snr_avg', 0)
+                        node.battery_level = data['battery_level']
+                        node.is_gateway = data['is_gateway']
+                    return
             
             node = Node(
                 id=node_id,
-                last_seen=time.time(),
-                rssi=signal_quality.get('rssi_avg', 0),
+                last_seen=self._now,
+                rssi=rssi,
                 snr=signal_quality.get('snr_avg', 0),
                 hop_count=1,  # Direct connection
                 battery_level=data['battery_level'],
                 is_gateway=data['is_gateway']
             )
             
-            self._register_node(node_id, node)
-            
-            # Update network graph
-            weight = 1.0 / (abs(node.rssi) + 1)  # Better RSSI = lower weight
-            self.network_graph.add_edge(self.node_id, node_id, weight=weight)
+            # Link is added in the same snapshot as the node, so the routing
+            # table rebuilt by the registration already sees it
+            self._register_node(node_id, node, link_weight=weight)
 
     def _handle_heartbeat(self, data: Dict):
         """Handle heartbeat messages"""
         node_id = data['node_id']
-        if node_id in self.nodes:
-            self.nodes[node_id].last_seen = time.time()
+        node = self._snapshot.nodes.get(node_id)
+        if node is not None:
+            with self._node_lock(node_id):
+                self._refresh_last_seen(node)
+
+    def _refresh_last_seen(self, node: Node):
+        """Mark a node as seen now; caller holds its node lock"""
+        now = self._now
+        if node.last_seen != now:
+            node.last_seen = now
+            self._track_expiry(node.id, now)
 
     def _handle_route_update(self, data: Dict):
         """Handle route update messages"""
         node_id = data['node_id']
-        if node_id in self.nodes:
-            # Update routes through this node
-            for dest, next_hop in data['routes']:
-                if dest != self.node_id:
-                    path_length = nx.shortest_path_length(
-                        self.network_graph,
-                        self.node_id,
-                        node_id
-                    )
-                    
-                    if path_length < self.MAX_HOPS:
-                        self.routing_table[dest] = next_hop
+        if node_id in self._snapshot.nodes:
+            with self._writer_lock:
+                snapshot = self._snapshot
+                
+                # Distance to the advertising node doesn't depend on the route
+                path_length = snapshot.path_lengths.get(node_id, float('inf'))
+                if path_length >= self.MAX_HOPS:
+                    return
+                
+                # Update routes through this node
+                routing_table = dict(snapshot.routing_table)
+                for dest, next_hop in data['routes']:
+                    if dest != self.node_id:
+                        routing_table[dest] = next_hop
+                
+                self._snapshot = replace(snapshot, routing_table=routing_table)
 
     def _handle_data(self, data: Dict):
         """Handle data messages"""
@@ -330,39 +533,62 @@ class MeshNetworkManager:
         
         if data['next_hop'] == self.node_id:
             # Forward message
-            if data['destination'] in self.routing_table:
-                next_hop = self.routing_table[data['destination']]
+            next_hop = self._snapshot.routing_table.get(data['destination'])
+            if next_hop is not None:
                 data['next_hop'] = next_hop
                 
-                self.lora.send_message(
-                    json.dumps(data),
-                    MessagePriority.MEDIUM
-                )
+                packed = self._pack(data)
+                self.lora.send_message(packed, MessagePriority.MEDIUM)
                 
                 self.stats['messages_forwarded'] += 1
-                self.stats['total_bandwidth'] += len(data['payload'].encode())
+                self.stats['total_bandwidth'] += len(packed)
             else:
                 self.logger.warning(f"No route to {data['destination']}")
 
-    def _message_handler(self):
-        """Main message handling loop"""
-        while self.running:
-            try:
-                message = self.lora.receive_message(timeout=1.0)
-                if message:
-                    try:
-                        data = json.loads(message)
-                        message_type = MessageType(data['type'])
-                        
-                        if message_type in self.message_handlers:
-                            self.message_handlers[message_type](data)
-                            
-                    except (json.JSONDecodeError, KeyError, ValueError) as e:
-                        self.logger.error(f"Invalid message format: {e}")
-                
-            except Exception as e:
-                self.logger.error(f"Error in message handler: {e}")
-                time.sleep(1)
+    def _pack(self, obj) -> bytes:
+        """Serialize with the shared msgpack packer"""
+        with self._packer_lock:
+            return self._packer.pack(obj)
+
+    def _decode_message(self, message: bytes) -> Optional[Dict]:
+        """Decode a packed heartbeat or msgpack message into a dict"""
+        if not message:
+            return None
+        if message[0] == HEARTBEAT_TAG:
+            if len(message) != _HEARTBEAT.size:
+                return None
+            _, node_id, timestamp = _HEARTBEAT.unpack(message)
+            return {
+                'type': MessageType.HEARTBEAT.value,
+                'node_id': node_id.rstrip(b'\x00').decode(),
+                'timestamp': timestamp
+            }
+        return msgpack.unpackb(message, raw=False)
+
+    def _on_message(self, message: bytes):
+        """Decode a received message and dispatch it to its handler"""
+        try:
+            data = self._decode_message(message)
+            
+            # Malformed input is common on a noisy link, so it is rejected
+            # by branching rather than by raising
+            handler = None
+            if isinstance(data, dict):
+                tag = data.get('type')
+                if type(tag) is int and 0 <= tag < len(self._handlers_by_tag):
+                    handler = self._handlers_by_tag[tag]
+            
+            if handler is None:
+                self.stats['invalid_messages'] += 1
+                return
+            
+            handler(data)
+            
+        except (msgpack.UnpackException, KeyError, TypeError, ValueError) as e:
+            self.stats['invalid_messages'] += 1
+            self.logger.error(f"Invalid message format: {e}")
+        except Exception as e:
+            self.logger.error(f"Error in message handler: {e}")
 
 # Example usage
 if __name__ == '__main__':
@@ -1,9 +1,11 @@
 from prometheus_client import Counter, Gauge, Histogram, start_http_server
 import psutil
 import time
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 class MetricsCollector:
+    SYSTEM_METRICS_TTL = 5  # Seconds a psutil snapshot is reused
+
     def __init__(self, port: int = 9090):
         # Detection metrics
         self.detection_count = Counter(
@@ -20,6 +22,8 @@ class MetricsCollector:
             'Detection confidence scores',
             buckets=[0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
         )
+        self._confidence_sum = 0.0
+        self._confidence_count = 0
 
         # API metrics
         self.api_requests = Counter(
@@ -33,6 +37,9 @@ class MetricsCollector:
             ['endpoint'],
             buckets=[0.01, 0.05, 0.1, 0.5, 1.0, 5.0]
         )
+        # Labeled children bound on first use; the endpoint set is small
+        self._api_counter_cache: Dict[Tuple[str, str, int], Counter] = {}
+        self._api_latency_cache: Dict[str, Histogram] = {}
 
         # System metrics
         self.cpu_usage = Gauge(
@@ -47,6 +54,27 @@ class MetricsCollector:
             'flying_lora_disk_usage_percent',
             'Current disk usage percentage'
         )
+        self.memory_available = Gauge(
+            'flying_lora_memory_available_bytes',
+            'Current available memory in bytes'
+        )
+        self.temperature = Gauge(
+            'flying_lora_temperature_celsius',
+            'Thermal zone temperature in Celsius',
+            ['zone']
+        )
+        self.process_cpu = Gauge(
+            'flying_lora_process_cpu_percent',
+            'CPU usage percentage of a managed process',
+            ['process']
+        )
+        self.process_memory = Gauge(
+            'flying_lora_process_memory_percent',
+            'Memory usage percentage of a managed process',
+            ['process']
+        )
+        # (taken_at, cpu percent, memory used, disk percent)
+        self._sys_cache: Optional[Tuple[float, float, int, float]] = None
 
         # LoRa metrics
         self.lora_signal_strength = Gauge(
@@ -76,6 +104,7 @@ class MetricsCollector:
             'flying_lora_mission_success_rate',
             'Mission success rate as a percentage'
         )
+        self._mission_ema: Optional[float] = None  # Value behind the gauge
 
         # Start Prometheus HTTP server
         start_http_server(port)
@@ -85,19 +114,57 @@ class MetricsCollector:
         self.detection_count.inc()
         self.detection_latency.observe(latency)
         self.detection_confidence.observe(confidence)
+        self._confidence_sum += confidence
+        self._confidence_count += 1
+
+    def record_detection_scores(self, latency: float, confidence_sum: float, confidence_count: int):
+        """Record detection metrics from a frame's summed confidence scores"""
+        self.detection_count.inc()
+        self.detection_latency.observe(latency)
+        self.detection_confidence.observe(
+            confidence_sum / confidence_count if confidence_count else 0
+        )
+        self._confidence_sum += confidence_sum
+        self._confidence_count += confidence_count
+
+    @property
+    def mean_confidence(self) -> float:
+        """Running mean of all recorded confidence scores"""
+        if not self._confidence_count:
+            return 0.0
+        return self._confidence_sum / self._confidence_count
 
     def record_api_request(self, endpoint: str, method: str, status: int, latency: float):
         """Record API request metrics"""
-        self.api_requests.labels(endpoint=endpoint, method=method, status=status).inc()
-        self.api_latency.labels(endpoint=endpoint).observe(latency)
+        key = (endpoint, method, status)
+        counter = self._api_counter_cache.get(key)
+        if counter is None:
+            counter = self._api_counter_cache[key] = self.api_requests.labels(*key)
+        counter.inc()
+        
+        histogram = self._api_latency_cache.get(endpoint)
+        if histogram is None:
+            histogram = self._api_latency_cache[endpoint] = self.api_latency.labels(endpoint)
+        histogram.observe(latency)
 
     def update_system_metrics(self):
         """Update system resource metrics"""
-        self.cpu_usage.set(psutil.cpu_percent())
-        mem = psutil.virtual_memory()
-        self.memory_usage.set(mem.used)
-        disk = psutil.disk_usage('/')
-        self.disk_usage.set(disk.percent)
+        # Several callers may refresh close together; reuse a recent
+        # snapshot instead of reading /proc again
+        now = time.monotonic()
+        cache = self._sys_cache
+        if cache is None or now - cache[0] >= self.SYSTEM_METRICS_TTL:
+            cache = self._sys_cache = (
+                now,
+                psutil.cpu_percent(interval=None),
+                psutil.virtual_memory().used,
+                psutil.disk_usage('/').percent
+            )
+        
+        _, cpu, mem_used, disk_percent = cache
+        self.cpu_usage.set(cpu)
+        self.memory_usage.set(mem_used)
+        self.disk_usage.set(disk_percent)
 
     def record_lora_metrics(self, signal_strength: float, packets: Dict[str, int]):
         """Record LoRa communication metrics"""
@@ -113,13 +180,13 @@ class MetricsCollector:
         """Record mission-related metrics"""
         self.mission_duration.observe(duration)
         # Update success rate using exponential moving average
-        current_rate = self.mission_success_rate._value.get()
-        if current_rate is None:
-            current_rate = 100 if success else 0
+        sample = 100.0 if success else 0.0
+        if self._mission_ema is None:
+            self._mission_ema = sample
         else:
             # Use 0.1 as smoothing factor
-            current_rate = (0.9 * current_rate) + (0.1 * (100 if success else 0))
-        self.mission_success_rate.set(current_rate)
+            self._mission_ema = (0.9 * self._mission_ema) + (0.1 * sample)
+        self.mission_success_rate.set(self._mission_ema)
 
 # Example usage
 if __name__ == '__main__':
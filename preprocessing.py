@@ -0,0 +1,85 @@
+import numpy as np
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+import cv2
+
+try:
+    from numba import njit, prange, set_num_threads
+except ImportError:
+    njit = None  # Fall back to the numpy conversion
+
+# This module must not import TensorRT/CUDA: it is imported by the
+# preprocessing worker processes, which never touch the GPU.
+
+INPUT_SIZE = (300, 300)  # Model input width, height
+NUM_SLOTS = 2            # Shared-memory frame/tensor slots
+PIXEL_SCALE = np.float32(1 / 255.0)
+
+# Shared-memory views mapped once per worker process
+_worker_shm: List[shared_memory.SharedMemory] = []
+_worker_frames: Optional[np.ndarray] = None
+_worker_tensors: Optional[np.ndarray] = None
+_worker_resized: Optional[np.ndarray] = None
+
+def tensor_shape() -> Tuple[int, int, int]:
+    """CHW shape of a preprocessed model input"""
+    return (3, INPUT_SIZE[1], INPUT_SIZE[0])
+
+def resized_shape() -> Tuple[int, int, int]:
+    """HWC shape of a frame resized to the model input size"""
+    return (INPUT_SIZE[1], INPUT_SIZE[0], 3)
+
+def frame_views(frames_buf, tensors_buf,
+                frame_shape: Tuple[int, int, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Map shared buffers to per-slot frame and tensor arrays"""
+    frames = np.ndarray((NUM_SLOTS, *frame_shape), dtype=np.uint8, buffer=frames_buf)
+    tensors = np.ndarray((NUM_SLOTS, *tensor_shape()), dtype=np.float32, buffer=tensors_buf)
+    return frames, tensors
+
+def _hwc_to_chw_numpy(src: np.ndarray, dst: np.ndarray):
+    """Scale a HWC uint8 image into a CHW float32 tensor with numpy"""
+    # Each channel plane is scaled straight into the destination, no temporaries
+    for c in range(3):
+        np.multiply(src[:, :, c], PIXEL_SCALE, out=dst[c], dtype=np.float32)
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def preprocess_u8_to_chw_f32(src, dst):
+        """Scale a HWC uint8 image into a CHW float32 tensor in one pass"""
+        height, width, channels = src.shape
+        scale = np.float32(1 / 255.0)
+        for y in prange(height):
+            for x in range(width):
+                for c in range(channels):
+                    dst[c, y, x] = src[y, x, c] * scale
+else:
+    preprocess_u8_to_chw_f32 = _hwc_to_chw_numpy
+
+def preprocess_into(frame: np.ndarray, resized: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Resize a BGR frame and write the normalized CHW tensor into out"""
+    cv2.resize(frame, INPUT_SIZE, dst=resized)
+    preprocess_u8_to_chw_f32(resized, out)
+    return out
+
+def attach_shared_buffers(frames_name: str, tensors_name: str,
+                          frame_shape: Tuple[int, int, int]):
+    """Worker initializer: attach to the service's shared-memory slots"""
+    global _worker_frames, _worker_tensors, _worker_resized
+    if njit is not None:
+        # The pool already runs one worker per core; a full numba thread
+        # pool in each of them would oversubscribe the CPUs
+        set_num_threads(1)
+    
+    frames_shm = shared_memory.SharedMemory(name=frames_name)
+    tensors_shm = shared_memory.SharedMemory(name=tensors_name)
+
+    # Keep the mappings alive for the lifetime of the worker
+    _worker_shm[:] = [frames_shm, tensors_shm]
+    _worker_frames, _worker_tensors = frame_views(
+        frames_shm.buf, tensors_shm.buf, frame_shape
+    )
+    _worker_resized = np.empty(resized_shape(), dtype=np.uint8)
+
+def preprocess_slot(slot: int):
+    """Worker task: preprocess the frame in a slot into its tensor slot"""
+    preprocess_into(_worker_frames[slot], _worker_resized, _worker_tensors[slot])
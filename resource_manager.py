@@ -1,15 +1,48 @@
 import os
 import time
+import select
 import threading
 import logging
-import subprocess
-from typing import Dict, Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Set, Tuple
 import psutil
+from prometheus_client import Gauge
 from config import ConfigManager
 from logging_config import LoggerSetup, PerformanceProfiler
 from metrics import MetricsCollector
 
+HOUSEKEEPING_CPU_COUNT = 2  # CPUs background housekeeping threads may use
+
+def housekeeping_cpus() -> Set[int]:
+    """The slowest allowed CPUs (the little cluster on big.LITTLE SoCs)"""
+    def max_freq(cpu: int) -> int:
+        try:
+            with open(f"/sys/devices/system/cpu/cpu{cpu}/cpufreq/cpuinfo_max_freq") as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+    
+    allowed = sorted(os.sched_getaffinity(0), key=lambda cpu: (max_freq(cpu), cpu))
+    return set(allowed[:HOUSEKEEPING_CPU_COUNT])
+
+def pin_to_housekeeping_cpus():
+    """Restrict the calling thread to the housekeeping CPUs, where supported"""
+    if hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, housekeeping_cpus())
+        except OSError:
+            pass
+
 class ResourceManager:
+    # Monitor passes without thermal events adapt between these intervals
+    MIN_MONITOR_INTERVAL = 0.2
+    MAX_MONITOR_INTERVAL = 5.0
+    TEMP_EWMA_ALPHA = 0.3     # Smoothing of the per-pass temperature change
+    CALM_TEMP_DELTA = 0.5     # Smoothed change (°C) below which a pass is calm
+    CALM_PASSES = 5           # Calm passes in a row before the interval doubles
+    THERMAL_MARGIN = 5        # °C below critical_temp that forces the minimum
+    PROCESS_RESCAN_INTERVAL = 60  # Seconds between scans for watched processes
+
     def __init__(self):
         # Initialize configuration
         self.config = ConfigManager()
@@ -24,12 +57,38 @@ class ResourceManager:
         # Threading control
         self.running = False
         self.monitor_thread: Optional[threading.Thread] = None
+        self._sample_pool: Optional[ThreadPoolExecutor] = None
+        
+        # Adaptive monitor interval state
+        self._monitor_interval = 1.0
+        self._temp_ewma = 0.0
+        self._last_max_temp: Optional[float] = None
+        self._calm_passes = 0
+        
+        # Governor files to write, found on first use
+        self._governor_paths: Optional[List[str]] = None
+        
+        # Persistent fds for the sysfs control files, keyed by path
+        self._fd_cache: Dict[str, int] = {}
+        self._fd_lock = threading.Lock()
+        
+        # (zone type, temp fd) per thermal zone; zones are fixed after boot,
+        # so they are found and opened once and then read with pread
+        self._thermal_zone_fds: Optional[List[Tuple[str, int]]] = None
+        
+        # Thermal wakeups: zone temp files are watched with epoll, since
+        # sysfs signals trip-point crossings as POLLPRI; a pipe wakes the
+        # loop on stop()
+        self._epoll: Optional[select.epoll] = None
+        self._wake_r: Optional[int] = None
+        self._wake_w: Optional[int] = None
         
         # System paths
         self.cpu_gov_path = "/sys/devices/system/cpu/cpu{}/cpufreq/scaling_governor"
+        self.cpufreq_dir = "/sys/devices/system/cpu/cpufreq"
         self.gpu_freq_path = "/sys/devices/gpu.0/devfreq/17000000.gv11b/max_freq"
         self.fan_speed_path = "/sys/devices/pwm-fan/target_pwm"
-        self.thermal_zones = "/sys/class/thermal/thermal_zone*"
+        self.thermal_dir = "/sys/class/thermal"
         
         # Current state
         self.current_power_mode = None
@@ -43,6 +102,26 @@ class ResourceManager:
             'logging_service': 10  # Low priority
         }
         
+        # Label-bound metric children, bound once per process and zone
+        self._proc_cpu_gauges = {
+            name: self.metrics.process_cpu.labels(process=name)
+            for name in self.process_priorities
+        }
+        self._proc_memory_gauges = {
+            name: self.metrics.process_memory.labels(process=name)
+            for name in self.process_priorities
+        }
+        self._temp_gauges: Dict[str, Gauge] = {}
+        
+        # Processes named in process_priorities, found by a full scan and
+        # then polled directly; rescanned periodically or when one exits
+        self._watched_processes: List[psutil.Process] = []
+        self._next_process_scan = 0.0
+        
+        # Last known nice value per watched PID, read when the process is
+        # found and updated on every successful setpriority
+        self._last_prio: Dict[int, int] = {}
+        
         # Register configuration observer
         self.config.register_observer(self._handle_config_change)
 
@@ -50,6 +129,15 @@ class ResourceManager:
         """Start resource management"""
         if not self.running:
             self.running = True
+            self._open_thermal_watch()
+            
+            # Thermal, memory and process sampling are all syscall-bound, so
+            # each pass runs them side by side on housekeeping CPUs
+            self._sample_pool = ThreadPoolExecutor(
+                max_workers=3,
+                thread_name_prefix='resource-sample',
+                initializer=pin_to_housekeeping_cpus
+            )
             self.monitor_thread = threading.Thread(target=self._monitor_loop)
             self.monitor_thread.start()
             self.logger.info("Resource manager started")
@@ -58,10 +146,80 @@ class ResourceManager:
         """Stop resource management"""
         if self.running:
             self.running = False
+            if self._wake_w is not None:
+                os.write(self._wake_w, b'\0')
             if self.monitor_thread:
                 self.monitor_thread.join()
+            if self._sample_pool:
+                self._sample_pool.shutdown()
+                self._sample_pool = None
+            self._close_thermal_watch()
+            self._close_thermal_zones()
+            self._close_fds()
             self.logger.info("Resource manager stopped")
 
+    def _open_thermal_watch(self):
+        """Register thermal zone temp files and the stop pipe with epoll"""
+        self._epoll = select.epoll()
+        self._wake_r, self._wake_w = os.pipe()
+        self._epoll.register(self._wake_r, select.EPOLLIN)
+        
+        for _, fd in self._get_thermal_zone_fds():
+            try:
+                self._epoll.register(fd, select.EPOLLPRI)
+            except OSError:
+                pass  # Not pollable; covered by the interval wakeup
+
+    def _close_thermal_watch(self):
+        """Close the epoll instance and the stop pipe"""
+        for fd in (self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._wake_r = self._wake_w = None
+        if self._epoll is not None:
+            self._epoll.close()
+            self._epoll = None
+
+    def _get_thermal_zone_fds(self) -> List[Tuple[str, int]]:
+        """Find and open the thermal zones on first use"""
+        if self._thermal_zone_fds is None:
+            try:
+                with os.scandir(self.thermal_dir) as entries:
+                    zones = [
+                        entry.path for entry in entries
+                        if entry.name.startswith('thermal_zone') and entry.is_dir()
+                    ]
+            except OSError as e:
+                self.logger.error(f"Failed to list thermal zones: {e}")
+                zones = []
+            
+            zone_fds = []
+            for zone in zones:
+                try:
+                    with open(os.path.join(zone, 'type'), 'r') as f:
+                        zone_type = f.read().strip()
+                    fd = os.open(os.path.join(zone, 'temp'), os.O_RDONLY | os.O_CLOEXEC)
+                except OSError:
+                    continue
+                zone_fds.append((zone_type, fd))
+            self._thermal_zone_fds = zone_fds
+        return self._thermal_zone_fds
+
+    def _close_thermal_zones(self):
+        """Close the cached thermal zone fds"""
+        for _, fd in self._thermal_zone_fds or ():
+            os.close(fd)
+        self._thermal_zone_fds = None
+
+    def _wait_for_wakeup(self):
+        """Block until a thermal event, stop(), or the next aligned interval"""
+        # Fallback wakeups land on whole multiples of the interval, so they
+        # coincide with other timers aligned the same way. A fired zone is
+        # re-armed by the get_thermal_zones read that follows every wakeup.
+        interval = self._monitor_interval
+        timeout = interval - (time.time() % interval)
+        self._epoll.poll(timeout)
+
     def set_power_mode(self, mode: str):
         """Set power mode (5W/10W)"""
         try:
@@ -81,15 +239,52 @@ class ResourceManager:
         except Exception as e:
             self.logger.error(f"Failed to set power mode: {e}")
 
+    def _get_fd(self, path: str, flags: int) -> int:
+        """Open a sysfs file on first use and keep the fd for later calls"""
+        fd = self._fd_cache.get(path)
+        if fd is None:
+            with self._fd_lock:
+                fd = self._fd_cache.get(path)
+                if fd is None:
+                    fd = self._fd_cache[path] = os.open(path, flags | os.O_CLOEXEC)
+        return fd
+
+    def _close_fds(self):
+        """Close every cached sysfs fd"""
+        with self._fd_lock:
+            for fd in self._fd_cache.values():
+                os.close(fd)
+            self._fd_cache.clear()
+
+    def _get_governor_paths(self) -> List[str]:
+        """Governor files covering every core, one per cpufreq policy if possible"""
+        if self._governor_paths is None:
+            # A policy is shared by all cores of a cluster, so writing the
+            # policies takes one write per cluster instead of one per core
+            try:
+                with os.scandir(self.cpufreq_dir) as entries:
+                    paths = sorted(
+                        os.path.join(entry.path, 'scaling_governor') for entry in entries
+                        if entry.name.startswith('policy') and entry.is_dir()
+                    )
+            except OSError:
+                paths = []
+            
+            if not paths:
+                paths = [self.cpu_gov_path.format(cpu) for cpu in range(psutil.cpu_count())]
+            self._governor_paths = paths
+        return self._governor_paths
+
     def _set_cpu_governor(self, governor: str):
         """Set CPU governor for all cores"""
         try:
-            cpu_count = psutil.cpu_count()
-            for cpu in range(cpu_count):
-                gov_path = self.cpu_gov_path.format(cpu)
-                if os.path.exists(gov_path):
-                    with open(gov_path, 'w') as f:
-                        f.write(governor)
+            data = governor.encode()
+            for path in self._get_governor_paths():
+                try:
+                    fd = self._get_fd(path, os.O_WRONLY)
+                except FileNotFoundError:
+                    continue
+                os.pwrite(fd, data, 0)
             
             self.logger.info(f"CPU governor set to {governor}")
             
@@ -100,11 +295,13 @@ class ResourceManager:
     def _set_gpu_freq(self, freq: int):
         """Set GPU maximum frequency"""
         try:
-            if os.path.exists(self.gpu_freq_path):
-                with open(self.gpu_freq_path, 'w') as f:
-                    f.write(str(freq))
-                
-                self.logger.info(f"GPU frequency set to {freq}")
+            try:
+                fd = self._get_fd(self.gpu_freq_path, os.O_WRONLY)
+            except FileNotFoundError:
+                return
+            os.pwrite(fd, str(freq).encode(), 0)
+            
+            self.logger.info(f"GPU frequency set to {freq}")
             
         except Exception as e:
             self.logger.error(f"Failed to set GPU frequency: {e}")
@@ -114,6 +311,7 @@ class ResourceManager:
         """Set process priority (nice value)"""
         try:
             os.setpriority(os.PRIO_PROCESS, pid, priority)
+            self._last_prio[pid] = priority
             self.logger.info(f"Process {pid} priority set to {priority}")
             
         except Exception as e:
@@ -121,21 +319,12 @@ class ResourceManager:
 
     def get_thermal_zones(self) -> Dict[str, float]:
         """Get temperature readings from all thermal zones"""
-        temps = {}
         try:
-            for zone in subprocess.glob.glob(self.thermal_zones):
-                type_path = os.path.join(zone, 'type')
-                temp_path = os.path.join(zone, 'temp')
-                
-                if os.path.exists(type_path) and os.path.exists(temp_path):
-                    with open(type_path, 'r') as f:
-                        zone_type = f.read().strip()
-                    with open(temp_path, 'r') as f:
-                        # Temperature is in millicelsius
-                        temp = float(f.read().strip()) / 1000
-                    temps[zone_type] = temp
-            
-            return temps
+            # Temperature is in millicelsius
+            return {
+                zone_type: int(os.pread(fd, 16, 0)) / 1000
+                for zone_type, fd in self._get_thermal_zone_fds()
+            }
             
         except Exception as e:
             self.logger.error(f"Failed to read thermal zones: {e}")
@@ -145,11 +334,13 @@ class ResourceManager:
         """Set fan speed (0-255)"""
         try:
             speed = max(0, min(255, speed))  # Clamp value
-            if os.path.exists(self.fan_speed_path):
-                with open(self.fan_speed_path, 'w') as f:
-                    f.write(str(speed))
-                
-                self.logger.info(f"Fan speed set to {speed}")
+            try:
+                fd = self._get_fd(self.fan_speed_path, os.O_RDWR)
+            except FileNotFoundError:
+                return
+            os.pwrite(fd, str(speed).encode(), 0)
+            
+            self.logger.info(f"Fan speed set to {speed}")
             
         except Exception as e:
             self.logger.error(f"Failed to set fan speed: {e}")
@@ -177,35 +368,70 @@ class ResourceManager:
         """Get statistics for monitored processes"""
         stats = []
         try:
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-                if proc.info['name'] in self.process_priorities.keys():
-                    stats.append({
-                        'pid': proc.info['pid'],
-                        'name': proc.info['name'],
-                        'cpu_percent': proc.info['cpu_percent'],
-                        'memory_percent': proc.info['memory_percent'],
-                        'priority': os.getpriority(os.PRIO_PROCESS, proc.info['pid'])
-                    })
+            if time.monotonic() >= self._next_process_scan:
+                self._scan_watched_processes()
+            
+            for proc in self._watched_processes:
+                try:
+                    info = proc.as_dict(attrs=['pid', 'name', 'cpu_percent', 'memory_percent'])
+                except psutil.NoSuchProcess:
+                    self._next_process_scan = 0.0  # Rescan on the next pass
+                    continue
+                
+                stats.append({
+                    'pid': info['pid'],
+                    'name': info['name'],
+                    'cpu_percent': info['cpu_percent'],
+                    'memory_percent': info['memory_percent']
+                })
             return stats
             
         except Exception as e:
             self.logger.error(f"Failed to get process stats: {e}")
             return []
 
+    def _scan_watched_processes(self):
+        """Find the processes named in process_priorities"""
+        watched = []
+        last_prio = {}
+        for proc in psutil.process_iter(['name']):
+            if proc.info['name'] in self.process_priorities:
+                # Seed cpu_percent so the first real reading covers an interval
+                try:
+                    proc.cpu_percent(None)
+                    nice = self._last_prio.get(proc.pid)
+                    if nice is None:
+                        nice = proc.nice()
+                except psutil.NoSuchProcess:
+                    continue
+                watched.append(proc)
+                last_prio[proc.pid] = nice
+        
+        self._watched_processes = watched
+        self._last_prio = last_prio
+        self._next_process_scan = time.monotonic() + self.PROCESS_RESCAN_INTERVAL
+
     @PerformanceProfiler.profile(logging.getLogger(__name__))
     def _monitor_loop(self):
         """Main monitoring loop"""
+        # Keep housekeeping off the cores the detection pipeline runs on
+        pin_to_housekeeping_cpus()
+        
         while self.running:
             try:
                 # Get system metrics
-                temps = self.get_thermal_zones()
-                mem_usage = self.get_memory_usage()
-                proc_stats = self.get_process_stats()
+                temps_future = self._sample_pool.submit(self.get_thermal_zones)
+                mem_future = self._sample_pool.submit(self.get_memory_usage)
+                proc_future = self._sample_pool.submit(self.get_process_stats)
+                temps = temps_future.result()
+                mem_usage = mem_future.result()
+                proc_stats = proc_future.result()
                 
                 # Check thermal throttling
                 max_temp = max(temps.values()) if temps else 0
                 if max_temp > self.critical_temp:
                     self._handle_thermal_throttling(max_temp)
+                self._adapt_monitor_interval(max_temp)
                 
                 # Adjust process priorities if needed
                 self._adjust_priorities(proc_stats)
@@ -213,19 +439,44 @@ class ResourceManager:
                 # Update metrics
                 self._update_metrics(temps, mem_usage, proc_stats)
                 
-                time.sleep(1)  # Check every second
+                self._wait_for_wakeup()
                 
             except Exception as e:
                 self.logger.error(f"Error in monitor loop: {e}")
                 time.sleep(5)  # Wait before retrying
 
+    def _adapt_monitor_interval(self, max_temp: float):
+        """Widen the monitor interval while temperatures are steady"""
+        if self._last_max_temp is not None:
+            delta = abs(max_temp - self._last_max_temp)
+            alpha = self.TEMP_EWMA_ALPHA
+            self._temp_ewma = alpha * delta + (1 - alpha) * self._temp_ewma
+        self._last_max_temp = max_temp
+        
+        if max_temp > self.critical_temp - self.THERMAL_MARGIN:
+            # Near the throttle point: react as fast as possible
+            self._monitor_interval = self.MIN_MONITOR_INTERVAL
+            self._calm_passes = 0
+        elif self._temp_ewma < self.CALM_TEMP_DELTA:
+            # Only widen after a run of calm passes, so one quiet reading
+            # doesn't slow the response to a trend
+            self._calm_passes += 1
+            if self._calm_passes >= self.CALM_PASSES:
+                self._monitor_interval = min(self._monitor_interval * 2, self.MAX_MONITOR_INTERVAL)
+                self._calm_passes = 0
+        else:
+            self._monitor_interval = max(self._monitor_interval / 2, self.MIN_MONITOR_INTERVAL)
+            self._calm_passes = 0
+
     def _handle_thermal_throttling(self, temp: float):
         """Handle thermal throttling"""
         try:
             # Increase fan speed
-            current_speed = int(open(self.fan_speed_path, 'r').read().strip())
+            fd = self._get_fd(self.fan_speed_path, os.O_RDWR)
+            current_speed = int(os.pread(fd, 16, 0))
             new_speed = min(255, current_speed + 50)
-            self.set_fan_speed(new_speed)
+            if new_speed != current_speed:  # Already at full speed otherwise
+                self.set_fan_speed(new_speed)
             
             # Reduce GPU frequency
             if self.current_power_mode == '10W':
@@ -240,7 +491,7 @@ class ResourceManager:
         try:
             for proc in proc_stats:
                 target_priority = self.process_priorities.get(proc['name'])
-                if target_priority is not None and proc['priority'] != target_priority:
+                if target_priority is not None and self._last_prio.get(proc['pid']) != target_priority:
                     self.set_process_priority(proc['pid'], target_priority)
             
         except Exception as e:
@@ -251,7 +502,10 @@ class ResourceManager:
         try:
             # Temperature metrics
             for zone, temp in temps.items():
-                self.metrics.temperature.labels(zone=zone).set(temp)
+                gauge = self._temp_gauges.get(zone)
+                if gauge is None:
+                    gauge = self._temp_gauges[zone] = self.metrics.temperature.labels(zone=zone)
+                gauge.set(temp)
             
             # Memory metrics
             self.metrics.memory_usage.set(mem_usage['used'])
@@ -259,12 +513,8 @@ class ResourceManager:
             
             # Process metrics
             for proc in proc_stats:
-                self.metrics.process_cpu.labels(
-                    process=proc['name']
-                ).set(proc['cpu_percent'])
-                self.metrics.process_memory.labels(
-                    process=proc['name']
-                ).set(proc['memory_percent'])
+                self._proc_cpu_gauges[proc['name']].set(proc['cpu_percent'])
+                self._proc_memory_gauges[proc['name']].set(proc['memory_percent'])
             
         except Exception as e:
             self.logger.error(f"Failed to update metrics: {e}")
@@ -29,6 +29,10 @@ def run_tests(args):
     if not any([args.unit, args.integration, args.load, args.hardware, args.performance]):
         cmd.extend(["tests/"])  # Run all tests if none specified
     
+    # Include tests marked slow
+    if args.runslow:
+        cmd.append("--runslow")
+    
     # Add coverage options
     if args.coverage:
         cmd.extend([
@@ -45,17 +49,28 @@ def run_tests(args):
             f"--benchmark-storage={args.report_dir}/benchmarks"
         ])
     
+    # Run in parallel with pytest-xdist; benchmarks stay single-process so
+    # their timings aren't skewed by other workers
+    if not args.benchmark and args.jobs != 1:
+        cmd.extend(["-n", "auto" if args.jobs == 0 else str(args.jobs)])
+        if args.hardware or args.integration:
+            # Keep each file on one worker so expensive fixtures are reused
+            cmd.append("--dist=loadfile")
+        else:
+            # Honour xdist_group marks, e.g. the heavy load tests share a worker
+            cmd.append("--dist=loadgroup")
+    
     # Run tests
     print(f"\nRunning tests: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
     
-    # Save test output
+    # Stream test output straight into the report file instead of
+    # buffering the whole log in memory
     output_file = Path(args.report_dir) / "test_output.txt"
+    print(f"Writing test output to {output_file}")
+    # Skip plugin autoloading; tests/conftest.py loads the plugins we use
+    env = dict(os.environ, PYTEST_DISABLE_PLUGIN_AUTOLOAD="1")
     with open(output_file, "w") as f:
-        f.write(result.stdout)
-        if result.stderr:
-            f.write("\n\nErrors:\n")
-            f.write(result.stderr)
+        result = subprocess.run(cmd, stdout=f, stderr=subprocess.STDOUT, env=env)
     
     # Generate test summary
     elapsed = time.time() - start_time
@@ -112,6 +127,9 @@ def main():
     # Test options
     parser.add_argument("--coverage", action="store_true", help="Generate coverage reports")
     parser.add_argument("--benchmark", action="store_true", help="Run benchmarks")
+    parser.add_argument("--runslow", action="store_true", help="Include slow tests")
+    parser.add_argument("--jobs", type=int, default=0,
+                      help="Parallel test workers (0 = one per CPU, 1 = no parallelism)")
     parser.add_argument("--report-dir", type=str, default="test_reports",
                       help="Base directory for test reports")
     
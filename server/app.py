@@ -1,19 +1,33 @@
+import threading
 from flask import Flask, jsonify, request
 
 app = Flask(__name__)
 
-# Global variable to store current operation mode
-current_mode = 1  # Default to mode 1
+class ModeState:
+    """Current operation mode, shared by the server's request threads"""
+    def __init__(self, mode: int = 1):
+        self._lock = threading.Lock()
+        self._mode = mode
+
+    def get(self) -> int:
+        with self._lock:
+            return self._mode
+
+    def set(self, mode: int):
+        with self._lock:
+            self._mode = mode
+
+# Current operation mode
+mode_state = ModeState(1)  # Default to mode 1
 
 @app.route('/mode', methods=['GET'])
 def get_mode():
     """Get the current operation mode"""
-    return jsonify({'mode': current_mode})
+    return jsonify({'mode': mode_state.get()})
 
 @app.route('/mode', methods=['POST'])
 def set_mode():
     """Set the operation mode"""
-    global current_mode
     data = request.get_json()
     
     if 'mode' not in data:
@@ -25,17 +39,19 @@ def set_mode():
     if new_mode not in [1, 2, 3]:
         return jsonify({'error': 'Invalid mode. Must be 1, 2, or 3'}), 400
     
-    current_mode = new_mode
-    return jsonify({'mode': current_mode})
+    mode_state.set(new_mode)
+    return jsonify({'mode': new_mode})
 
 @app.route('/status', methods=['GET'])
 def get_status():
     """Get the server status and current mode"""
     return jsonify({
         'status': 'running',
-        'mode': current_mode
+        'mode': mode_state.get()
     })
 
 if __name__ == '__main__':
+    from waitress import serve
+    
     # Run the server on all available network interfaces
-    app.run(host='0.0.0.0', port=8080, debug=True) 
\ No newline at end of file
+    serve(app, host='0.0.0.0', port=8080, threads=8)
@@ -5,9 +5,9 @@ import json
 import random
 import threading
 import logging
-from typing import Dict, List, Optional, Tuple
+import collections
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
-from queue import Queue
 from pathlib import Path
 
 from config import ConfigManager
@@ -15,6 +15,7 @@ from logging_config import LoggerSetup
 from lora_protocol import LoRaProtocolHandler, MessagePriority
 from mesh_network import MeshNetworkManager, Node
 from hardware_interface import HardwareInterface
+from resource_manager import pin_to_housekeeping_cpus
 
 @dataclass
 class SimulatedObject:
@@ -24,7 +25,64 @@ class SimulatedObject:
     velocity: Tuple[float, float]  # dx, dy per frame
     size: Tuple[float, float]     # width, height in normalized coordinates
 
+class SimulatedObjects:
+    """Simulated objects stored as parallel arrays, one row per object"""
+    def __init__(self, objects: List[SimulatedObject]):
+        self.class_names = [obj.class_name for obj in objects]
+        self.confidences = [obj.confidence for obj in objects]
+        self.colors = [
+            (0, 255, 0) if name == 'person' else (255, 0, 0)
+            for name in self.class_names
+        ]
+        self.positions = np.array([obj.position for obj in objects], dtype=np.float64).reshape(-1, 2)
+        self.velocities = np.array([obj.velocity for obj in objects], dtype=np.float64).reshape(-1, 2)
+        self.sizes = np.array([obj.size for obj in objects], dtype=np.float64).reshape(-1, 2)
+
+    def __len__(self) -> int:
+        return len(self.class_names)
+
+    def step(self):
+        """Advance every object by one frame, wrapping at the frame edges"""
+        np.add(self.positions, self.velocities, out=self.positions)
+        np.mod(self.positions, 1.0, out=self.positions)
+
+    def bboxes(self, width: int, height: int) -> np.ndarray:
+        """Pixel (x1, y1, x2, y2) boxes for every object"""
+        scale = np.array((width, height), dtype=np.float64)
+        corners = (self.positions * scale).astype(np.int32)
+        extents = (self.sizes * scale).astype(np.int32)
+        return np.hstack((corners, corners + extents))
+
+    def to_list(self) -> List[SimulatedObject]:
+        """Copy the current state out as SimulatedObject records"""
+        return [
+            SimulatedObject(
+                class_name=name,
+                confidence=confidence,
+                position=tuple(position),
+                velocity=tuple(velocity),
+                size=tuple(size)
+            )
+            for name, confidence, position, velocity, size in zip(
+                self.class_names, self.confidences, self.positions.tolist(),
+                self.velocities.tolist(), self.sizes.tolist()
+            )
+        ]
+
 class SimulationEnvironment:
+    TELEMETRY_FIELDS = ('cpu_temp', 'gpu_temp', 'battery_voltage', 'memory_usage')
+    
+    # Frame counter text: origin, font, scale, thickness
+    COUNTER_ORIGIN = (10, 30)
+    COUNTER_FONT = cv2.FONT_HERSHEY_SIMPLEX
+    COUNTER_SCALE = 1
+    COUNTER_THICKNESS = 2
+    
+    # Process-wide shared environment, reference counted by acquire/release
+    _instance: Optional['SimulationEnvironment'] = None
+    _refcount = 0
+    _instance_lock = threading.Lock()
+
     def __init__(self):
         # Initialize configuration and logging
         self.config = ConfigManager()
@@ -38,7 +96,7 @@ class SimulationEnvironment:
         self.frame_interval = 1.0 / self.fps
         
         # Initialize simulated objects
-        self.objects = [
+        self.sim_objects = SimulatedObjects([
             SimulatedObject(
                 class_name='person',
                 confidence=0.95,
@@ -47,39 +105,81 @@ class SimulationEnvironment:
                 size=(0.1, 0.2)
             )
             for _ in range(3)
-        ]
+        ])
         
-        # Initialize virtual nodes
-        self.nodes: Dict[str, Dict] = {
-            f"node_{i}": {
-                'position': (random.random() * 1000, random.random() * 1000),  # meters
-                'battery': 100.0,
-                'rssi': -60,
-                'snr': 10
-            }
-            for i in range(5)
-        }
+        # Random source for the telemetry and node random walks
+        self._rng = np.random.default_rng()
+        
+        # Initialize virtual nodes, one array element per node
+        self.node_ids = [f"node_{i}" for i in range(5)]
+        num_nodes = len(self.node_ids)
+        self.node_positions = self._rng.random((num_nodes, 2)) * 1000  # meters
+        self.node_battery = np.full(num_nodes, 100.0)
+        self.node_rssi = np.full(num_nodes, -60.0)
+        self.node_snr = np.full(num_nodes, 10.0)
         
         # Frame generation
         self.frame_count = 0
         self.running = False
-        self.frame_queue = Queue(maxsize=10)
+        
+        # Single-producer queues that drop the oldest entry when full; each
+        # event is set by the producer and lets consumers block for data
+        self.frame_queue = collections.deque(maxlen=10)
+        self._frame_ready = threading.Event()
+        
+        # Frames are drawn into a ring of reused buffers, one slot per
+        # queued frame plus two. get_frame() returns a view into the ring;
+        # when the queue is backlogged the consumer gets the oldest frame,
+        # whose slot is redrawn only a few frames later. Callers that keep a
+        # frame beyond their next get_frame() must copy it.
+        self._frame_ring = np.zeros(
+            (self.frame_queue.maxlen + 2, self.frame_height, self.frame_width, 3),
+            dtype=np.uint8
+        )
         
         # Detection results
-        self.detection_queue = Queue(maxsize=10)
+        self.detection_queue = collections.deque(maxlen=10)
+        self._detection_ready = threading.Event()
         
-        # Telemetry data
-        self.telemetry = {
-            'cpu_temp': 45.0,
-            'gpu_temp': 65.0,
-            'battery_voltage': 11.8,
-            'memory_usage': 60.0
-        }
+        # Telemetry data, indexed like TELEMETRY_FIELDS
+        self._telemetry = np.array([45.0, 65.0, 11.8, 60.0])
+        self._telemetry_step = np.array([0.5, 0.5, 0.1, 1.0])
+        self._telemetry_lo = np.array([35.0, 45.0, 10.5, 20.0])
+        self._telemetry_hi = np.array([85.0, 95.0, 12.6, 95.0])
+        
+        # Pre-rendered frame counter glyphs
+        self._build_counter_tiles()
         
         # Start simulation threads
         self.frame_thread = None
         self.telemetry_thread = None
 
+    @classmethod
+    def acquire(cls) -> 'SimulationEnvironment':
+        """Get the shared, started environment and take a reference to it"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+            cls._refcount += 1
+            return cls._instance
+
+    @classmethod
+    def release(cls):
+        """Drop a reference; the last one stops the shared environment"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                return
+            cls._refcount -= 1
+            if cls._refcount == 0:
+                cls._instance.stop()
+                cls._instance = None
+
+    @property
+    def objects(self) -> List[SimulatedObject]:
+        """Snapshot of the simulated objects (changes are not written back)"""
+        return self.sim_objects.to_list()
+
     def start(self):
         """Start simulation"""
         if not self.running:
@@ -106,116 +206,169 @@ class SimulationEnvironment:
 
     def get_frame(self) -> Optional[np.ndarray]:
         """Get next simulated frame"""
-        try:
-            return self.frame_queue.get(timeout=1.0)
-        except Queue.Empty:
-            return None
+        return self._pop_wait(self.frame_queue, self._frame_ready, 1.0)
 
     def get_detection(self) -> Optional[Dict]:
         """Get next simulated detection result"""
+        return self._pop_wait(self.detection_queue, self._detection_ready, 1.0)
+
+    @staticmethod
+    def _pop_wait(items: collections.deque, ready: threading.Event, timeout: float):
+        """Pop the oldest item, waiting up to timeout for one to arrive"""
+        if not items:
+            # Clear before re-checking, so an append racing with the clear
+            # still leaves the event set
+            ready.clear()
+            if not items:
+                ready.wait(timeout)
         try:
-            return self.detection_queue.put(timeout=1.0)
-        except Queue.Empty:
+            return items.popleft()
+        except IndexError:
             return None
 
+    @property
+    def telemetry(self) -> Dict[str, float]:
+        """Current telemetry values by field name"""
+        return dict(zip(self.TELEMETRY_FIELDS, self._telemetry.tolist()))
+
+    @property
+    def nodes(self) -> Dict[str, Dict]:
+        """Snapshot of the virtual node states by node id"""
+        return {
+            node_id: {
+                'position': tuple(position),
+                'battery': battery,
+                'rssi': rssi,
+                'snr': snr
+            }
+            for node_id, position, battery, rssi, snr in zip(
+                self.node_ids, self.node_positions.tolist(), self.node_battery.tolist(),
+                self.node_rssi.tolist(), self.node_snr.tolist()
+            )
+        }
+
     def get_telemetry(self) -> Dict:
         """Get current telemetry data"""
-        return self.telemetry.copy()
+        return self.telemetry
 
     def _frame_generator(self):
         """Generate simulated camera frames"""
+        # Frames are paced against a monotonic deadline that advances by one
+        # interval per frame, so sleep overshoot doesn't accumulate as drift
+        deadline = time.monotonic() + self.frame_interval
         while self.running:
-            start_time = time.time()
+            # Clear the next buffer in the ring
+            frame = self._frame_ring[self.frame_count % len(self._frame_ring)]
+            frame.fill(0)
             
-            # Create blank frame
-            frame = np.zeros((self.frame_height, self.frame_width, 3), dtype=np.uint8)
+            # Update all object positions at once, then draw each box
+            objects = self.sim_objects
+            objects.step()
+            bboxes = objects.bboxes(self.frame_width, self.frame_height).tolist()
+            for (x1, y1, x2, y2), color in zip(bboxes, objects.colors):
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
             
-            # Update object positions
-            detections = []
-            for obj in self.objects:
-                # Update position
-                x, y = obj.position
-                dx, dy = obj.velocity
-                
-                x = (x + dx) % 1.0
-                y = (y + dy) % 1.0
-                obj.position = (x, y)
-                
-                # Draw object
-                w, h = obj.size
-                px = int(x * self.frame_width)
-                py = int(y * self.frame_height)
-                pw = int(w * self.frame_width)
-                ph = int(h * self.frame_height)
-                
-                # Draw rectangle
-                color = (0, 255, 0) if obj.class_name == 'person' else (255, 0, 0)
-                cv2.rectangle(frame, (px, py), (px + pw, py + ph), color, 2)
-                
-                # Add detection
-                detections.append({
-                    'class': obj.class_name,
-                    'confidence': obj.confidence,
-                    'bbox': [px, py, px + pw, py + ph]
-                })
+            detections = [
+                {
+                    'class': class_name,
+                    'confidence': confidence,
+                    'bbox': bbox
+                }
+                for class_name, confidence, bbox in zip(
+                    objects.class_names, objects.confidences, bboxes
+                )
+            ]
             
-            # Add frame number and timestamp
-            cv2.putText(
-                frame,
-                f"Frame: {self.frame_count}",
-                (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                1,
-                (255, 255, 255),
-                2
-            )
+            # Add frame number
+            self._draw_frame_counter(frame)
             
             # Queue frame and detections
-            self.frame_queue.put(frame)
-            self.detection_queue.put({
+            self.frame_queue.append(frame)
+            self._frame_ready.set()
+            self.detection_queue.append({
                 'frame_id': self.frame_count,
                 'timestamp': time.time(),
                 'objects': detections
             })
+            self._detection_ready.set()
             
             self.frame_count += 1
             
             # Maintain FPS
-            elapsed = time.time() - start_time
-            if elapsed < self.frame_interval:
-                time.sleep(self.frame_interval - elapsed)
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            elif remaining < -self.frame_interval:
+                # More than a frame behind: drop the backlog instead of
+                # producing frames back to back to catch up
+                deadline = time.monotonic()
+            deadline += self.frame_interval
+
+    def _build_counter_tiles(self):
+        """Render the counter label and digits once as (tile, advance) pairs"""
+        font, scale, thickness = self.COUNTER_FONT, self.COUNTER_SCALE, self.COUNTER_THICKNESS
+        
+        def text_width(text: str) -> int:
+            return cv2.getTextSize(text, font, scale, thickness)[0][0]
+        
+        (_, text_height), baseline = cv2.getTextSize("Frame: 0123456789", font, scale, thickness)
+        self._counter_pad = thickness + 1  # Room for strokes past the glyph box
+        self._counter_top = self.COUNTER_ORIGIN[1] - text_height - self._counter_pad
+        tile_height = text_height + baseline + 2 * self._counter_pad
+        
+        def render(text: str, advance: int) -> Tuple[np.ndarray, int]:
+            tile = np.zeros((tile_height, text_width(text) + 2 * self._counter_pad, 3), dtype=np.uint8)
+            cv2.putText(
+                tile,
+                text,
+                (self._counter_pad, self.COUNTER_ORIGIN[1] - self._counter_top),
+                font,
+                scale,
+                (255, 255, 255),
+                thickness
+            )
+            return tile, advance
+        
+        # A glyph's advance is how far putText moves the pen past it, which
+        # getTextSize only reports as a difference between two strings
+        self._label_tile = render("Frame: ", text_width("Frame: 0") - text_width("0"))
+        self._digit_tiles = {
+            digit: render(digit, text_width(digit * 2) - text_width(digit))
+            for digit in "0123456789"
+        }
+
+    def _draw_frame_counter(self, frame: np.ndarray):
+        """Compose "Frame: N" from the pre-rendered tiles"""
+        top = self._counter_top
+        x = self.COUNTER_ORIGIN[0] - self._counter_pad
+        tiles = [self._label_tile]
+        tiles.extend(self._digit_tiles[digit] for digit in str(self.frame_count))
+        for tile, advance in tiles:
+            height, width = tile.shape[:2]
+            region = frame[top:top + height, x:x + width]
+            # Max-blend so white text overlays anything already drawn
+            np.maximum(region, tile[:region.shape[0], :region.shape[1]], out=region)
+            x += advance
 
     def _telemetry_generator(self):
         """Generate simulated telemetry data"""
+        # Only telemetry is pinned; the frame generator stays on any core
+        pin_to_housekeeping_cpus()
+        
+        rng = self._rng
+        num_nodes = len(self.node_ids)
         while self.running:
-            # Update telemetry with random variations
-            self.telemetry['cpu_temp'] += random.uniform(-0.5, 0.5)
-            self.telemetry['gpu_temp'] += random.uniform(-0.5, 0.5)
-            self.telemetry['battery_voltage'] += random.uniform(-0.1, 0.1)
-            self.telemetry['memory_usage'] += random.uniform(-1.0, 1.0)
-            
-            # Keep values in reasonable ranges
-            self.telemetry['cpu_temp'] = np.clip(self.telemetry['cpu_temp'], 35, 85)
-            self.telemetry['gpu_temp'] = np.clip(self.telemetry['gpu_temp'], 45, 95)
-            self.telemetry['battery_voltage'] = np.clip(self.telemetry['battery_voltage'], 10.5, 12.6)
-            self.telemetry['memory_usage'] = np.clip(self.telemetry['memory_usage'], 20, 95)
+            # Update telemetry with random variations, kept in reasonable ranges
+            self._telemetry += rng.uniform(-self._telemetry_step, self._telemetry_step)
+            np.clip(self._telemetry, self._telemetry_lo, self._telemetry_hi, out=self._telemetry)
             
-            # Update node states
-            for node_id, node in self.nodes.items():
-                # Update position with random walk
-                x, y = node['position']
-                x += random.uniform(-1, 1)  # 1 meter steps
-                y += random.uniform(-1, 1)
-                node['position'] = (x, y)
-                
-                # Update battery level
-                node['battery'] -= random.uniform(0.01, 0.05)
-                if node['battery'] < 0:
-                    node['battery'] = 100.0
-                
-                # Update signal quality
-                node['rssi'] = -60 + random.uniform(-10, 10)
-                node['snr'] = 10 + random.uniform(-2, 2)
+            # Update node states: 1 meter random-walk steps, battery drain
+            # with recharge on depletion, fresh signal quality
+            self.node_positions += rng.uniform(-1, 1, (num_nodes, 2))
+            self.node_battery -= rng.uniform(0.01, 0.05, num_nodes)
+            self.node_battery[self.node_battery < 0] = 100.0
+            self.node_rssi = -60 + rng.uniform(-10, 10, num_nodes)
+            self.node_snr = 10 + rng.uniform(-2, 2, num_nodes)
             
             time.sleep(1.0)  # Update every second
 
@@ -223,8 +376,7 @@ class SimulatedHardwareInterface(HardwareInterface):
     """Simulated hardware interface for development"""
     def __init__(self):
         super().__init__()
-        self.simulation = SimulationEnvironment()
-        self.simulation.start()
+        self.simulation = SimulationEnvironment.acquire()
 
     def initialize_camera(self):
         """Initialize simulated camera"""
@@ -234,7 +386,10 @@ class SimulatedHardwareInterface(HardwareInterface):
     def read_camera_frame(self) -> Tuple[bool, np.ndarray]:
         """Read frame from simulated camera"""
         frame = self.simulation.get_frame()
-        return True, frame if frame is not None else np.zeros((480, 640, 3))
+        if frame is None:
+            return True, np.zeros((480, 640, 3))
+        # Copy out of the simulation's frame ring: callers may queue the frame
+        return True, frame.copy()
 
     def get_gps_location(self) -> Dict:
         """Get simulated GPS location"""
@@ -252,22 +407,27 @@ class SimulatedHardwareInterface(HardwareInterface):
 
     def cleanup(self):
         """Cleanup simulation"""
-        self.simulation.stop()
-        super().cleanup()
+        self.stop()
+        if self.simulation is not None:
+            SimulationEnvironment.release()
+            self.simulation = None
 
 class SimulatedLoRaHandler(LoRaProtocolHandler):
     """Simulated LoRa protocol handler"""
+    # Every live handler shares one simulated radio channel; replaced
+    # wholesale on join/leave so senders can iterate without a lock
+    _channel: Tuple['SimulatedLoRaHandler', ...] = ()
+    _channel_lock = threading.Lock()
+
     def __init__(self):
         super().__init__()
-        self.simulation = SimulationEnvironment()
+        self.simulation = SimulationEnvironment.acquire()
         
-        # Virtual message queue
-        self.virtual_queue = Queue()
-        
-        # Start simulation
-        self.simulation.start()
+        with SimulatedLoRaHandler._channel_lock:
+            SimulatedLoRaHandler._channel = SimulatedLoRaHandler._channel + (self,)
 
-    def send_message(self, message: str, priority: MessagePriority = MessagePriority.MEDIUM) -> str:
+    def send_message(self, message: Union[str, bytes],
+                     priority: MessagePriority = MessagePriority.MEDIUM) -> int:
         """Simulate sending message with virtual delay"""
         message_id = super().send_message(message, priority)
         
@@ -280,38 +440,35 @@ class SimulatedLoRaHandler(LoRaProtocolHandler):
         
         time.sleep(delay)
         
-        # Queue message for virtual delivery
-        self.virtual_queue.put({
-            'message_id': message_id,
-            'content': message,
-            'timestamp': time.time()
-        })
+        # LoRa is a broadcast medium: every other handler on the channel
+        # receives the message through its normal receive path
+        data = message.encode() if isinstance(message, str) else bytes(message)
+        for peer in SimulatedLoRaHandler._channel:
+            if peer is not self:
+                peer._dispatch_message(data)
         
         return message_id
 
-    def receive_message(self, timeout: float = None) -> Optional[str]:
-        """Receive message from virtual queue"""
-        try:
-            data = self.virtual_queue.get(timeout=timeout)
-            return data['content']
-        except Queue.Empty:
-            return None
-
     def get_signal_quality(self) -> Dict:
         """Get simulated signal quality"""
         # Get random node's signal quality
-        node_id = random.choice(list(self.simulation.nodes.keys()))
-        node = self.simulation.nodes[node_id]
+        simulation = self.simulation
+        index = random.randrange(len(simulation.node_ids))
         
         return {
-            'rssi': node['rssi'],
-            'snr': node['snr']
+            'rssi': float(simulation.node_rssi[index]),
+            'snr': float(simulation.node_snr[index])
         }
 
     def cleanup(self):
         """Cleanup simulation"""
-        self.simulation.stop()
-        super().cleanup()
+        with SimulatedLoRaHandler._channel_lock:
+            SimulatedLoRaHandler._channel = tuple(
+                peer for peer in SimulatedLoRaHandler._channel if peer is not self
+            )
+        if self.simulation is not None:
+            SimulationEnvironment.release()
+            self.simulation = None
 
 # Example usage
 if __name__ == '__main__':
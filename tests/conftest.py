@@ -1,8 +1,8 @@
 import os
+import logging
 import pytest
-import tempfile
 import redis
-import sqlite3
+import psutil
 from unittest.mock import MagicMock
 from config import ConfigManager
 from lora_protocol import LoRaProtocolHandler
@@ -12,6 +12,40 @@ from cache_manager import CacheManager
 from detection_service import DetectionService
 from hardware_interface import HardwareInterface
 
+# Load-test worker errors are counted in its stats; pytest still shows their
+# captured tracebacks when a test fails
+logging.getLogger("load_test").addHandler(logging.NullHandler())
+
+# With PYTEST_DISABLE_PLUGIN_AUTOLOAD=1 (run_tests.py sets it) pytest skips
+# scanning every installed plugin, so load the ones this suite uses here.
+# Listing them while autoload is on would register them twice.
+if os.environ.get("PYTEST_DISABLE_PLUGIN_AUTOLOAD"):
+    pytest_plugins = [
+        "pytest_asyncio.plugin",
+        "pytest_cov.plugin",
+        "pytest_benchmark.plugin",
+        "xdist.plugin"
+    ]
+
+def pytest_configure(config):
+    """Register custom markers"""
+    config.addinivalue_line("markers", "slow: long-running test, skipped unless --runslow is given")
+    config.addinivalue_line("markers", "realtime: runs on the wall clock instead of the virtual test clock")
+
+def pytest_addoption(parser):
+    """Register command-line options"""
+    parser.addoption("--runslow", action="store_true", default=False,
+                     help="run tests marked slow")
+
+def pytest_collection_modifyitems(config, items):
+    """Skip slow tests unless --runslow is given"""
+    if config.getoption("--runslow"):
+        return
+    skip_slow = pytest.mark.skip(reason="need --runslow option to run")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
 @pytest.fixture(scope="session")
 def config():
     """Global test configuration"""
@@ -19,23 +53,30 @@ def config():
     config = ConfigManager()
     return config
 
+# Allowed RSS growth over the whole session, in MB
+RSS_GROWTH_LIMIT_MB = 200
+
+@pytest.fixture(scope="session", autouse=True)
+def rss_baseline():
+    """Capture RSS at session start and check total growth at teardown"""
+    process = psutil.Process()
+    baseline = process.memory_info().rss / 1024 / 1024  # MB
+    yield baseline
+    growth = process.memory_info().rss / 1024 / 1024 - baseline
+    assert growth < RSS_GROWTH_LIMIT_MB, f"Memory usage grew {growth:.0f} MB over the session"
+
 @pytest.fixture(scope="function")
-def temp_db():
+def temp_db(tmp_path):
     """Temporary SQLite database"""
-    fd, path = tempfile.mkstemp()
-    conn = sqlite3.connect(path)
-    yield path
-    
-    conn.close()
-    os.close(fd)
-    os.unlink(path)
+    # tmp_path is cleaned up by pytest
+    return str(tmp_path / "test.db")
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def redis_mock():
     """Mock Redis instance"""
     return MagicMock(spec=redis.Redis)
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def lora_mock():
     """Mock LoRa hardware interface"""
     mock = MagicMock(spec=LoRaProtocolHandler)
@@ -43,15 +84,22 @@ def lora_mock():
     mock.get_signal_quality.return_value = {'rssi': -60, 'snr': 10}
     return mock
 
-@pytest.fixture(scope="function")
+class _FakeCamera:
+    """Stateless camera stub; far cheaper than a MagicMock"""
+    __slots__ = ()
+
+    def read(self):
+        return (True, b'mock_frame_data')
+
+    def isOpened(self):
+        return True
+
+@pytest.fixture(scope="session")
 def camera_mock():
     """Mock camera feed"""
-    mock = MagicMock()
-    mock.read.return_value = (True, b'mock_frame_data')
-    mock.isOpened.return_value = True
-    return mock
+    return _FakeCamera()
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def hardware_mock(camera_mock):
     """Mock hardware interface"""
     mock = MagicMock(spec=HardwareInterface)
@@ -64,6 +112,15 @@ def hardware_mock(camera_mock):
     }
     return mock
 
+@pytest.fixture(autouse=True)
+def _reset_mocks(request):
+    """Clear call records and side effects on the session mocks after each test"""
+    yield
+    # Only reset mocks this test actually created or used
+    for name in ('redis_mock', 'lora_mock', 'hardware_mock'):
+        if name in request.fixturenames:
+            request.getfixturevalue(name).reset_mock(side_effect=True)
+
 @pytest.fixture(scope="function")
 def time_series_db(temp_db):
     """TimeSeriesDB instance with temporary database"""
@@ -71,14 +128,21 @@ def time_series_db(temp_db):
     yield db
     db.close()
 
-@pytest.fixture(scope="function")
-def cache_manager(redis_mock):
-    """CacheManager instance with mock Redis"""
+@pytest.fixture(scope="session")
+def _cache_manager_impl(redis_mock):
+    """Shared CacheManager instance with mock Redis"""
     manager = CacheManager()
     manager.redis = redis_mock
     yield manager
     manager.close()
 
+@pytest.fixture(scope="function")
+def cache_manager(_cache_manager_impl, redis_mock):
+    """CacheManager instance with mock Redis"""
+    # Its state lives in the mock Redis, which is reset after every test
+    _cache_manager_impl.redis = redis_mock
+    return _cache_manager_impl
+
 @pytest.fixture(scope="function")
 def mesh_network(lora_mock):
     """MeshNetworkManager instance with mock LoRa"""
@@ -88,9 +152,12 @@ def mesh_network(lora_mock):
     manager.stop()
 
 @pytest.fixture(scope="function")
-def detection_service(hardware_mock):
+def detection_service(request):
     """DetectionService instance with mock hardware"""
     service = DetectionService()
-    service.hardware = hardware_mock
+    # The service never opens hardware itself, so only build and attach the
+    # mock for tests that ask for it
+    if "hardware_mock" in request.fixturenames:
+        service.hardware = request.getfixturevalue("hardware_mock")
     yield service
     service.stop() 
\ No newline at end of file
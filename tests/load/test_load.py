@@ -1,24 +1,63 @@
+import os
 import time
+import logging
+import itertools
+import shutil
+import tempfile
 import threading
 import random
+import multiprocessing
+from multiprocessing import util as mp_util
+import msgpack
 import pytest
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import List, Dict, Optional
 
 from simulation import SimulationEnvironment, SimulatedLoRaHandler, SimulatedHardwareInterface
-from mesh_network import MeshNetworkManager
+from mesh_network import MeshNetworkManager, MessageType
 from data_storage import TimeSeriesDB
 from cache_manager import CacheManager
 
+# Size of the pregenerated random-number buffers
+RAND_BUFFER_SIZE = 10_000
+
+# Worker errors are logged rather than printed; conftest.py silences this logger
+log = logging.getLogger("load_test")
+
+# Seconds each mesh node spends sending: a quick pass, and a full soak behind --runslow
+LOAD_TEST_DURATION = 0.5
+SOAK_TEST_DURATION = 60
+
+# Simulation owned by each detection worker process
+_worker_sim: Optional[SimulationEnvironment] = None
+
+def _init_worker_sim():
+    """Detection worker initializer: start a simulation in this process"""
+    global _worker_sim
+    _worker_sim = SimulationEnvironment.acquire()
+    # Stop the frame threads before the worker exits, or it never joins
+    mp_util.Finalize(None, SimulationEnvironment.release, exitpriority=10)
+
+def _detection_processing_task() -> Optional[Dict]:
+    """Simulate detection processing in a worker process"""
+    # Get frame and process detection
+    frame = _worker_sim.get_frame()
+    if frame is None:
+        return None
+    return _worker_sim.get_detection()
+
 class LoadTest:
-    def __init__(self, num_nodes: int = 10, duration: int = 60):
+    def __init__(self, num_nodes: int = 10, duration: float = 60):
         self.num_nodes = num_nodes
         self.duration = duration
         
         # Initialize components
-        self.simulation = SimulationEnvironment()
-        self.db = TimeSeriesDB(db_path=":memory:")  # In-memory database for testing
+        # Shared with the simulated LoRa handlers, started on first acquire
+        self.simulation = SimulationEnvironment.acquire()
+        # File database in WAL mode so worker threads read and write concurrently
+        self.db_dir = tempfile.mkdtemp(prefix="loadtest_")
+        self.db = TimeSeriesDB(db_path=os.path.join(self.db_dir, "timeseries.db"))
         self.cache = CacheManager()
         
         # Create mesh network nodes
@@ -40,14 +79,30 @@ class LoadTest:
             'cache_operations': 0,
             'errors': 0
         }
+        self.stats_lock = threading.Lock()
+        
+        # Keep cache keys apart when pytest-xdist workers share one Redis
+        self.key_prefix = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+        
+        # Random numbers drawn in bulk; tasks step through them with an
+        # atomic counter and wrap around rather than refilling under a lock
+        self.rng = np.random.default_rng()
+        self._rand_buf = self.rng.random(RAND_BUFFER_SIZE).tolist()
+        self._key_buf = self.rng.integers(0, 100, size=RAND_BUFFER_SIZE).tolist()
+        self._rand_idx = itertools.count()
+        
+        # Reused by the cache tasks. Sharing one payload is safe because the
+        # cache serializes it straight to JSON and keeps no reference.
+        self._cache_keys = [f"{self.key_prefix}:test_key_{i}" for i in range(1, 101)]
+        self._cache_payload = {'value': 0.0, 'timestamp': 0.0}
         
         # Start components
-        self.simulation.start()
         for node in self.nodes:
             node.start()
 
-    def run_mesh_network_test(self):
+    def run_mesh_network_test(self) -> Dict:
         """Test mesh network under load"""
+        phase_stats = dict.fromkeys(self.stats, 0)
         try:
             with ThreadPoolExecutor(max_workers=self.num_nodes) as executor:
                 # Submit message sending tasks
@@ -57,7 +112,7 @@ class LoadTest:
                         executor.submit(
                             self._node_communication_task,
                             self.nodes[i],
-                            self.nodes[(i + 1) % self.num_nodes].node_id
+                            self.nodes[(i + 1) % self.num_nodes]
                         )
                     )
                 
@@ -65,47 +120,66 @@ class LoadTest:
                 for future in as_completed(futures):
                     try:
                         stats = future.result()
-                        self._update_stats(stats)
-                    except Exception as e:
-                        self.stats['errors'] += 1
-                        print(f"Error in mesh network test: {e}")
+                        self._merge_stats(phase_stats, stats)
+                    except Exception:
+                        phase_stats['errors'] += 1
+                        log.exception("Error in mesh network test")
             
-        except Exception as e:
-            print(f"Mesh network test failed: {e}")
-            self.stats['errors'] += 1
+        except Exception:
+            log.exception("Mesh network test failed")
+            phase_stats['errors'] += 1
+        
+        return phase_stats
 
-    def run_detection_test(self):
+    def run_detection_test(self) -> Dict:
         """Test detection processing under load"""
+        phase_stats = dict.fromkeys(self.stats, 0)
         try:
-            with ThreadPoolExecutor(max_workers=4) as executor:
+            # Frame generation is CPU-bound, so fan out across processes.
+            # Spawn rather than fork: this process is running simulation threads.
+            with ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker_sim
+            ) as executor:
                 futures = []
                 for _ in range(100):  # Process 100 frames
                     futures.append(
-                        executor.submit(self._detection_processing_task)
+                        executor.submit(_detection_processing_task)
                     )
                 
                 for future in as_completed(futures):
                     try:
-                        stats = future.result()
-                        self._update_stats(stats)
-                    except Exception as e:
-                        self.stats['errors'] += 1
-                        print(f"Error in detection test: {e}")
+                        detection = future.result()
+                        if detection:
+                            # Cache detection result
+                            self.cache.set_detection_result(
+                                f"{self.key_prefix}:det_{time.time()}",
+                                detection
+                            )
+                            phase_stats['detections_processed'] += 1
+                    except Exception:
+                        phase_stats['errors'] += 1
+                        log.exception("Error in detection test")
             
-        except Exception as e:
-            print(f"Detection test failed: {e}")
-            self.stats['errors'] += 1
+        except Exception:
+            log.exception("Detection test failed")
+            phase_stats['errors'] += 1
+        
+        return phase_stats
 
-    def run_database_test(self):
+    def run_database_test(self) -> Dict:
         """Test database operations under load"""
+        phase_stats = dict.fromkeys(self.stats, 0)
         try:
             with ThreadPoolExecutor(max_workers=4) as executor:
                 futures = []
                 
-                # Write operations
-                for _ in range(1000):
+                # Write operations, batched 100 rows per transaction
+                values = self.rng.random(1000)
+                for start in range(0, len(values), 100):
                     futures.append(
-                        executor.submit(self._database_operation_task)
+                        executor.submit(self._database_batch_task, values[start:start + 100])
                     )
                 
                 # Read operations
@@ -117,17 +191,20 @@ class LoadTest:
                 for future in as_completed(futures):
                     try:
                         stats = future.result()
-                        self._update_stats(stats)
-                    except Exception as e:
-                        self.stats['errors'] += 1
-                        print(f"Error in database test: {e}")
+                        self._merge_stats(phase_stats, stats)
+                    except Exception:
+                        phase_stats['errors'] += 1
+                        log.exception("Error in database test")
             
-        except Exception as e:
-            print(f"Database test failed: {e}")
-            self.stats['errors'] += 1
+        except Exception:
+            log.exception("Database test failed")
+            phase_stats['errors'] += 1
+        
+        return phase_stats
 
-    def run_cache_test(self):
+    def run_cache_test(self) -> Dict:
         """Test cache operations under load"""
+        phase_stats = dict.fromkeys(self.stats, 0)
         try:
             with ThreadPoolExecutor(max_workers=4) as executor:
                 futures = []
@@ -141,80 +218,75 @@ class LoadTest:
                 for future in as_completed(futures):
                     try:
                         stats = future.result()
-                        self._update_stats(stats)
-                    except Exception as e:
-                        self.stats['errors'] += 1
-                        print(f"Error in cache test: {e}")
+                        self._merge_stats(phase_stats, stats)
+                    except Exception:
+                        phase_stats['errors'] += 1
+                        log.exception("Error in cache test")
             
-        except Exception as e:
-            print(f"Cache test failed: {e}")
-            self.stats['errors'] += 1
+        except Exception:
+            log.exception("Cache test failed")
+            phase_stats['errors'] += 1
+        
+        return phase_stats
 
-    def _node_communication_task(self, node: MeshNetworkManager, target_id: str) -> Dict:
+    def _node_communication_task(self, node: MeshNetworkManager, target: MeshNetworkManager) -> Dict:
         """Simulate node communication"""
         stats = {'messages_sent': 0, 'messages_received': 0, 'errors': 0}
         
-        start_time = time.time()
-        while time.time() - start_time < self.duration:
-            try:
-                # Send message
-                message = f"test_message_{time.time()}"
-                node.send_message(target_id, message)
-                stats['messages_sent'] += 1
-                
-                # Receive message
-                received = node.lora.receive_message(timeout=1.0)
-                if received:
-                    stats['messages_received'] += 1
-                
-                time.sleep(random.uniform(0.1, 0.5))
-                
-            except Exception as e:
-                stats['errors'] += 1
-                print(f"Error in node communication: {e}")
+        # The target's mesh layer consumes its messages, so count this
+        # node's data frames as they reach the target's radio
+        received = itertools.count()
         
-        return stats
-
-    def _detection_processing_task(self) -> Dict:
-        """Simulate detection processing"""
-        stats = {'detections_processed': 0, 'errors': 0}
+        def on_receive(message: bytes):
+            try:
+                data = msgpack.unpackb(message, raw=False)
+            except (msgpack.UnpackException, ValueError):
+                return  # Heartbeats are not msgpack
+            if (isinstance(data, dict) and data.get('type') == MessageType.DATA.value
+                    and data.get('source') == node.node_id
+                    and data.get('destination') == target.node_id):
+                next(received)
         
+        target.lora.register_receive_callback(on_receive)
         try:
-            # Get frame and process detection
-            frame = self.simulation.get_frame()
-            if frame is not None:
-                detection = self.simulation.get_detection()
-                if detection:
-                    # Cache detection result
-                    self.cache.set_detection_result(
-                        f"det_{time.time()}",
-                        detection
-                    )
-                    stats['detections_processed'] += 1
-            
-        except Exception as e:
-            stats['errors'] += 1
-            print(f"Error in detection processing: {e}")
+            deadline = time.monotonic() + self.duration
+            while time.monotonic() < deadline:
+                try:
+                    # Send message
+                    message = f"test_message_{time.time()}"
+                    node.send_message(target.node_id, message)
+                    stats['messages_sent'] += 1
+                    
+                    time.sleep(random.uniform(0.1, 0.5))
+                    
+                except Exception:
+                    stats['errors'] += 1
+                    log.exception("Error in node communication")
+        finally:
+            target.lora.unregister_receive_callback(on_receive)
         
+        # Simulated sends deliver before returning, so the count is final
+        stats['messages_received'] = next(received)
         return stats
 
-    def _database_operation_task(self) -> Dict:
-        """Simulate database operations"""
+    def _database_batch_task(self, values: np.ndarray) -> Dict:
+        """Simulate batched database inserts"""
         stats = {'db_operations': 0, 'errors': 0}
         
         try:
-            # Insert test data
-            self.db.insert(
-                metric_name="test_metric",
-                value=random.random(),
-                tags={'test': 'load'},
-                data={'timestamp': time.time()}
-            )
-            stats['db_operations'] += 1
+            # Insert test data in one transaction
+            tags = {'test': 'load'}
+            data = {'timestamp': time.time()}
+            records = [
+                ("test_metric", value, tags, data)
+                for value in values.tolist()
+            ]
+            self.db.insert_many(records)
+            stats['db_operations'] += len(records)
             
-        except Exception as e:
+        except Exception:
             stats['errors'] += 1
-            print(f"Error in database operation: {e}")
+            log.exception("Error in database operation")
         
         return stats
 
@@ -234,9 +306,9 @@ class LoadTest:
             )
             stats['db_operations'] += 1
             
-        except Exception as e:
+        except Exception:
             stats['errors'] += 1
-            print(f"Error in database query: {e}")
+            log.exception("Error in database query")
         
         return stats
 
@@ -246,54 +318,66 @@ class LoadTest:
         
         try:
             # Set and get cache data
-            key = f"test_key_{random.randint(1, 100)}"
-            data = {
-                'value': random.random(),
-                'timestamp': time.time()
-            }
+            i = next(self._rand_idx) % RAND_BUFFER_SIZE
+            key = self._cache_keys[self._key_buf[i]]
+            data = self._cache_payload
+            data['value'] = self._rand_buf[i]
+            data['timestamp'] = time.time()
             
             self.cache.set_detection_result(key, data)
             self.cache.get_detection_result(key)
             stats['cache_operations'] += 2
             
-        except Exception as e:
+        except Exception:
             stats['errors'] += 1
-            print(f"Error in cache operation: {e}")
+            log.exception("Error in cache operation")
         
         return stats
 
+    @staticmethod
+    def _merge_stats(total: Dict, new_stats: Dict):
+        """Add counters from new_stats into total"""
+        for key, value in new_stats.items():
+            if key in total:
+                total[key] += value
+
     def _update_stats(self, new_stats: Dict):
         """Update global statistics"""
-        for key, value in new_stats.items():
-            if key in self.stats:
-                self.stats[key] += value
+        with self.stats_lock:
+            self._merge_stats(self.stats, new_stats)
 
     def cleanup(self):
         """Cleanup test environment"""
-        self.simulation.stop()
         for node in self.nodes:
             node.stop()
+            node.lora.cleanup()
+        SimulationEnvironment.release()
         self.db.close()
+        shutil.rmtree(self.db_dir, ignore_errors=True)
         self.cache.close()
 
-def test_system_load():
+@pytest.mark.xdist_group(name="load")
+@pytest.mark.parametrize("duration", [
+    pytest.param(LOAD_TEST_DURATION, id="quick"),
+    pytest.param(SOAK_TEST_DURATION, id="soak", marks=pytest.mark.slow)
+])
+def test_system_load(duration):
     """Main load test"""
     # Initialize load test
-    load_test = LoadTest(num_nodes=10, duration=60)
+    load_test = LoadTest(num_nodes=10, duration=duration)
     
     try:
-        # Run tests
-        print("\nRunning mesh network test...")
-        load_test.run_mesh_network_test()
-        
-        print("\nRunning detection test...")
-        load_test.run_detection_test()
-        
-        print("\nRunning database test...")
-        load_test.run_database_test()
-        
-        print("\nRunning cache test...")
-        load_test.run_cache_test()
+        # Run all phases at once so I/O and CPU-bound waits overlap
+        print("\nRunning mesh network, detection, database and cache tests...")
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            futures = [
+                executor.submit(load_test.run_mesh_network_test),
+                executor.submit(load_test.run_detection_test),
+                executor.submit(load_test.run_database_test),
+                executor.submit(load_test.run_cache_test)
+            ]
+            for future in as_completed(futures):
+                load_test._update_stats(future.result())
         
         # Print results
         print("\nLoad Test Results:")
@@ -312,4 +396,4 @@ def test_system_load():
         load_test.cleanup()
 
 if __name__ == '__main__':
-    test_system_load() 
\ No newline at end of file
+    test_system_load(LOAD_TEST_DURATION) 
\ No newline at end of file
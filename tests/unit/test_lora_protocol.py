@@ -2,6 +2,7 @@ import pytest
 import json
 import time
 from unittest.mock import MagicMock, patch
+from fastcrc import crc32
 from lora_protocol import LoRaProtocolHandler, MessagePriority, LoRaPacket
 
 def test_message_fragmentation():
@@ -16,17 +17,11 @@ def test_message_fragmentation():
     assert len(handler.message_buffer) == 1
     assert message_id in handler.message_buffer
     
-    # Verify fragments in send queue
-    high_queue = handler.send_queue[MessagePriority.HIGH]
-    med_queue = handler.send_queue[MessagePriority.MEDIUM]
-    low_queue = handler.send_queue[MessagePriority.LOW]
+    # Verify fragments in send queue; each packet carries a header
+    payload_size = handler.MAX_PACKET_SIZE - handler.HEADER_SIZE
+    expected_fragments = (len(large_message) + payload_size - 1) // payload_size
     
-    total_fragments = sum(
-        queue.qsize() for queue in [high_queue, med_queue, low_queue]
-    )
-    expected_fragments = (len(large_message) + handler.MAX_PACKET_SIZE - 1) // handler.MAX_PACKET_SIZE
-    
-    assert total_fragments == expected_fragments
+    assert handler.total_queued_fragments == expected_fragments
 
 def test_message_priority():
     """Test message priority handling"""
@@ -38,14 +33,14 @@ def test_message_priority():
     handler.send_message("low priority", MessagePriority.LOW)
     
     # Check queue sizes
-    assert handler.send_queue[MessagePriority.HIGH].qsize() == 1
-    assert handler.send_queue[MessagePriority.MEDIUM].qsize() == 1
-    assert handler.send_queue[MessagePriority.LOW].qsize() == 1
+    assert len(handler.send_queue[MessagePriority.HIGH]) == 1
+    assert len(handler.send_queue[MessagePriority.MEDIUM]) == 1
+    assert len(handler.send_queue[MessagePriority.LOW]) == 1
     
     # Verify priority order
-    _, high_packet = handler.send_queue[MessagePriority.HIGH].get()
-    _, med_packet = handler.send_queue[MessagePriority.MEDIUM].get()
-    _, low_packet = handler.send_queue[MessagePriority.LOW].get()
+    high_packet = handler.send_queue[MessagePriority.HIGH].popleft()
+    med_packet = handler.send_queue[MessagePriority.MEDIUM].popleft()
+    low_packet = handler.send_queue[MessagePriority.LOW].popleft()
     
     assert high_packet.priority == MessagePriority.HIGH
     assert med_packet.priority == MessagePriority.MEDIUM
@@ -60,18 +55,23 @@ def test_packet_retransmission(mock_serial):
     mock_serial.return_value.write.return_value = len(b"test")
     handler.serial = mock_serial.return_value
     
-    # Send message
+    # Send message and transmit its queued fragments
     message_id = handler.send_message("test message")
+    fragments = list(handler.send_queue[MessagePriority.MEDIUM])
+    handler.send_queue[MessagePriority.MEDIUM].clear()
+    handler._write_all = MagicMock()
+    handler._send_packets(fragments)
+    assert message_id in handler.pending_acks
     
     # Simulate timeout
-    time.sleep(handler.ACK_TIMEOUT + 0.1)
+    with patch('lora_protocol.time.time', return_value=time.time() + handler.ACK_TIMEOUT + 0.1):
+        handler._check_pending_acks()
     
-    # Check pending acknowledgments
-    handler._check_pending_acks()
-    
-    # Verify retransmission
+    # Verify the buffered fragments were requeued at high priority
     assert message_id in handler.message_buffer
-    assert handler.signal_stats['retransmissions'] > 0
+    assert message_id not in handler.pending_acks
+    assert handler.signal_stats['retransmissions'] == 1
+    assert list(handler.send_queue[MessagePriority.HIGH]) == fragments
 
 def test_crc_validation():
     """Test CRC validation"""
@@ -90,9 +90,8 @@ def test_crc_validation():
         timestamp=time.time()
     )
     
-    # Calculate CRC
-    import zlib
-    valid_packet.crc = zlib.crc32(valid_packet.payload)
+    # Calculate CRC the same way the handler does
+    valid_packet.crc = crc32.iso_hdlc(valid_packet.payload)
     
     # Create invalid packet with wrong CRC
     invalid_packet = LoRaPacket(
@@ -126,7 +125,7 @@ def test_signal_quality_monitoring():
             total_fragments=1,
             priority=MessagePriority.MEDIUM,
             payload=b"test",
-            crc=zlib.crc32(b"test"),
+            crc=crc32.iso_hdlc(b"test"),
             rssi=-60 - i,  # Decreasing RSSI
             snr=10 - i,    # Decreasing SNR
             timestamp=time.time()
@@ -137,8 +136,9 @@ def test_signal_quality_monitoring():
     stats = handler.get_signal_quality()
     assert 'rssi_avg' in stats
     assert 'snr_avg' in stats
-    assert len(handler.signal_stats['rssi']) == 5
-    assert len(handler.signal_stats['snr']) == 5
+    assert stats['rssi_avg'] == -62
+    assert stats['snr_avg'] == 8
+    assert handler._sig_head == 5
 
 @pytest.mark.parametrize("message_size", [
     100,    # Small message
@@ -153,18 +153,21 @@ def test_message_sizes(message_size):
     # Send message
     message_id = handler.send_message(message)
     
-    # Calculate expected fragments
-    expected_fragments = (message_size + handler.MAX_PACKET_SIZE - 1) // handler.MAX_PACKET_SIZE
+    # Calculate expected fragments; each packet carries a header
+    payload_size = handler.MAX_PACKET_SIZE - handler.HEADER_SIZE
+    expected_fragments = (message_size + payload_size - 1) // payload_size
     
     # Check fragmentation
-    total_fragments = sum(
-        queue.qsize() for queue in handler.send_queue.values()
-    )
-    assert total_fragments == expected_fragments
+    assert handler.total_queued_fragments == expected_fragments
     
-    # Verify original message is stored
+    # Verify fragments are stored for retransmission
     assert message_id in handler.message_buffer
-    assert len(handler.message_buffer[message_id]) == message_size
+    # Fragment payloads are zero-copy memoryview slices of the encoded message;
+    # they are only copied when framed into the wire buffer
+    packets = handler.message_buffer[message_id]
+    assert all(isinstance(packet.payload, memoryview) for packet in packets)
+    stored = b''.join(packet.payload for packet in packets)
+    assert stored == message.encode()
 
 def test_concurrent_messages():
     """Test handling concurrent messages"""
@@ -176,7 +179,7 @@ def test_concurrent_messages():
     
     def send_message(text):
         message_id = handler.send_message(text)
-        messages.append(message_id)
+        messages.append((text, message_id))
     
     threads = []
     for i in range(5):
@@ -195,6 +198,50 @@ def test_concurrent_messages():
     assert len(messages) == 5
     assert len(handler.message_buffer) == 5
     
-    # Check message integrity
-    for i, message_id in enumerate(messages):
-        assert handler.message_buffer[message_id] == f"message_{i}" 
\ No newline at end of file
+    # Check message integrity; threads finish in any order
+    for text, message_id in messages:
+        stored = b''.join(packet.payload for packet in handler.message_buffer[message_id])
+        assert stored == text.encode()
+
+
+def test_message_subscribers():
+    """Test broadcast of reassembled messages to subscribers"""
+    handler = LoRaProtocolHandler()
+    first = handler.subscribe()
+    second = handler.subscribe()
+    
+    handler.received_fragments[1] = [[b"hello ", b"world"], 2]
+    handler._reassemble_message(1)
+    
+    # Every subscriber gets its own copy
+    assert list(first) == [b"hello world"]
+    assert list(second) == [b"hello world"]
+    
+    # Unsubscribed deques stop receiving
+    handler.unsubscribe(first)
+    handler.received_fragments[2] = [[b"again"], 1]
+    handler._reassemble_message(2)
+    
+    assert list(first) == [b"hello world"]
+    assert list(second) == [b"hello world", b"again"]
+
+def test_receive_callbacks():
+    """Test callback delivery of reassembled messages"""
+    handler = LoRaProtocolHandler()
+    received = []
+    handler.register_receive_callback(received.append)
+    
+    handler.received_fragments[1] = [[b"hello ", b"world"], 2]
+    handler._reassemble_message(1)
+    
+    # Callbacks consume the message instead of the receive queue
+    assert received == [b"hello world"]
+    assert handler.receive_queue.empty()
+    
+    # Without callbacks messages go back to the receive queue
+    handler.unregister_receive_callback(received.append)
+    handler.received_fragments[2] = [[b"again"], 1]
+    handler._reassemble_message(2)
+    
+    assert received == [b"hello world"]
+    assert handler.receive_message(timeout=0.1) == b"again"
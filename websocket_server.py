@@ -1,11 +1,29 @@
 import asyncio
-import json
-import logging
-from typing import Dict, Set
+import orjson
+import msgspec
+from typing import Dict, Optional, Set
 import websockets
 from websockets.server import WebSocketServerProtocol
+from websockets.exceptions import ConnectionClosed
 from metrics import MetricsCollector
-from logging_config import LoggerSetup, PerformanceProfiler
+from logging_config import LoggerSetup
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None  # Fall back to the default asyncio event loop
+
+BROADCAST_CONCURRENCY = 256  # Sends in flight at once per broadcast
+SEND_TIMEOUT = 1.0  # Seconds before a client is dropped as too slow
+
+class InboundMessage(msgspec.Struct):
+    """Message received from a dashboard client; unknown fields are ignored"""
+    type: str
+    command: Optional[str] = None
+    data: Optional[Dict] = None
+    name: Optional[str] = None
+    confidence: float = 0.5
+    file: Optional[str] = None
 
 class WebSocketManager:
     def __init__(self, host: str = 'localhost', port: int = 8765):
@@ -20,6 +38,7 @@ class WebSocketManager:
         self.host = host
         self.port = port
         self.clients: Set[WebSocketServerProtocol] = set()
+        self._decoder = msgspec.json.Decoder(InboundMessage)
         
         # System state
         self.detection_running = False
@@ -44,7 +63,8 @@ class WebSocketManager:
 
     async def unregister(self, websocket: WebSocketServerProtocol):
         """Unregister a client connection"""
-        self.clients.remove(websocket)
+        # broadcast() may already have dropped it
+        self.clients.discard(websocket)
         self.logger.info("Client disconnected", extra={
             'extra_fields': {
                 'client_id': id(websocket),
@@ -52,12 +72,25 @@ class WebSocketManager:
             }
         })
 
-    @PerformanceProfiler.profile(logging.getLogger(__name__))
     async def broadcast(self, message: Dict):
         """Broadcast message to all connected clients"""
         if self.clients:
+            # Encode once for every client. Send it as text because the
+            # dashboards JSON.parse() event.data, which a binary frame would break.
+            payload = orjson.dumps(message).decode()
+            sem = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+
+            async def send(client: WebSocketServerProtocol):
+                async with sem:
+                    try:
+                        await asyncio.wait_for(client.send(payload), SEND_TIMEOUT)
+                    except (asyncio.TimeoutError, ConnectionClosed):
+                        # Drop slow or dead clients rather than stall every broadcast
+                        self.clients.discard(client)
+
             await asyncio.gather(
-                *[client.send(json.dumps(message)) for client in self.clients]
+                *[send(client) for client in list(self.clients)],
+                return_exceptions=True
             )
 
     async def handle_detection_control(self, command: str):
@@ -75,11 +108,11 @@ class WebSocketManager:
                 'detection': False
             })
 
-    async def handle_mission(self, data: Dict):
+    async def handle_mission(self, msg: InboundMessage):
         """Handle mission commands"""
-        command = data.get('command')
+        command = msg.command
         if command == 'save':
-            mission_data = data.get('data', {})
+            mission_data = msg.data or {}
             # Save mission logic here
             self.logger.info("Mission saved", extra={
                 'extra_fields': {
@@ -88,7 +121,7 @@ class WebSocketManager:
                 }
             })
         elif command == 'execute':
-            mission_name = data.get('name')
+            mission_name = msg.name
             self.current_mission = mission_name
             # Execute mission logic here
             self.logger.info("Mission started", extra={
@@ -97,12 +130,12 @@ class WebSocketManager:
                 }
             })
 
-    async def handle_config(self, data: Dict):
+    async def handle_config(self, msg: InboundMessage):
         """Handle configuration updates"""
-        command = data.get('command')
+        command = msg.command
         if command == 'save':
-            config_file = data.get('file')
-            config_data = data.get('data', {})
+            config_file = msg.file
+            config_data = msg.data or {}
             # Save configuration logic here
             self.logger.info("Configuration updated", extra={
                 'extra_fields': {
@@ -113,24 +146,25 @@ class WebSocketManager:
     async def handle_message(self, websocket: WebSocketServerProtocol, message: str):
         """Handle incoming WebSocket messages"""
         try:
-            data = json.loads(message)
-            message_type = data.get('type')
+            msg = self._decoder.decode(message)
+            message_type = msg.type
 
             if message_type == 'control':
-                await self.handle_detection_control(data.get('command'))
+                await self.handle_detection_control(msg.command)
             elif message_type == 'mission':
-                await self.handle_mission(data)
+                await self.handle_mission(msg)
             elif message_type == 'config':
-                await self.handle_config(data)
+                await self.handle_config(msg)
             elif message_type == 'detection_settings':
                 # Update detection settings
                 self.metrics.record_detection(
                     latency=0.1,  # Example value
-                    confidence=data.get('confidence', 0.5)
+                    confidence=msg.confidence
                 )
 
-        except json.JSONDecodeError as e:
-            self.logger.error("Invalid JSON message", extra={
+        except msgspec.DecodeError as e:
+            # Covers malformed JSON and messages of the wrong shape
+            self.logger.error("Invalid message", extra={
                 'extra_fields': {
                     'error': str(e),
                     'message': message
@@ -172,6 +206,8 @@ class WebSocketManager:
 
     def run(self):
         """Run the WebSocket server"""
+        if uvloop is not None:
+            uvloop.install()
         asyncio.run(self.start_server())
 
 # Example usage